@@ -0,0 +1,210 @@
+# admission.py
+# 과부하 때 요청 받아들이기(admission control) / 버리기(load shedding).
+#
+# 한 반 전체가 동시에 룰렛 페이지를 열면 느린 DB 호출 뒤로 요청이 줄을 서고 결국 전부 시간 초과가 난다.
+# 그래서 워커 프로세스마다
+#   - 지금 처리 중인 요청 수 (우선순위별, 라우트별)
+#   - DB 커넥션 풀에서 커넥션을 받기까지 기다린 시간 (라우트별, 전체 EWMA)
+# 를 세고, 바쁠 때는 우선순위가 낮은 요청(5초마다 오는 /api/get_people 폴링)부터
+# DB 에 닿기 전에 바로 503 + Retry-After 로 돌려보낸다. 로그인과 룰렛 돌리기는 가장 마지막까지 받는다.
+import os
+import threading
+import time
+
+from flask import g, has_request_context, jsonify, request
+from flask_login import current_user, login_required
+from sqlalchemy.pool import QueuePool
+
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 1
+PRIORITY_HIGH = 2
+PRIORITY_NAMES = {PRIORITY_LOW: 'low', PRIORITY_NORMAL: 'normal', PRIORITY_HIGH: 'high'}
+
+# 목록에 없는 라우트는 NORMAL
+ROUTE_PRIORITIES = {
+    'main.get_people_api': PRIORITY_LOW,
+    'main.admin_people_api': PRIORITY_LOW,
+    'main.list_campaigns_api': PRIORITY_LOW,
+    'main.analytics_api': PRIORITY_LOW,
+    'main.room_people_api': PRIORITY_LOW,
+    'main.spin_history_api': PRIORITY_LOW,
+    'main.recent_spins_api': PRIORITY_LOW,
+    'main.login_api': PRIORITY_HIGH,
+    'main.login_page': PRIORITY_HIGH,
+    'main.spin_roulette': PRIORITY_HIGH,
+}
+# 과부하 판단에서 빼는 라우트 (상태를 보려고 부르는 것까지 막으면 안 되므로)
+EXEMPT_ENDPOINTS = {'admission_state', 'static'}
+
+EWMA_ALPHA = 0.2
+EWMA_HALF_LIFE = 2.0  # 초. 요청이 끊겨도 오래된 대기 시간이 계속 남아 있지 않도록 시간이 지나면 줄어든다
+
+
+class _Ewma:
+    def __init__(self):
+        self.value = 0.0
+        self.updated_at = time.monotonic()
+
+    def current(self, now):
+        return self.value * 0.5 ** ((now - self.updated_at) / EWMA_HALF_LIFE)
+
+    def add(self, sample, now):
+        self.value = self.current(now) * (1 - EWMA_ALPHA) + sample * EWMA_ALPHA
+        self.updated_at = now
+
+
+class _RouteStats:
+    def __init__(self, priority):
+        self.priority = priority
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = 0
+        self.latency = _Ewma()
+        self.pool_wait = _Ewma()
+
+
+class AdmissionController:
+    """
+    프로세스 하나 안에서의 요청 수/풀 대기 시간을 보고 받을지 버릴지 정한다.
+
+    우선순위마다 "이만큼 바쁘면 버린다"는 기준이 있다.
+      LOW    : 처리 중 요청이 max_in_flight 의 low_ratio 이상이거나, 풀 대기 EWMA 가 low_pool_wait 초 이상
+      NORMAL : 처리 중 요청이 max_in_flight 의 normal_ratio 이상이거나, 풀 대기 EWMA 가 normal_pool_wait 초 이상
+      HIGH   : 처리 중 요청이 max_in_flight 이상일 때만
+    """
+
+    def __init__(self, max_in_flight=8, low_ratio=0.5, normal_ratio=0.85,
+                 low_pool_wait=0.05, normal_pool_wait=0.25, low_retry_after=5, normal_retry_after=2):
+        self.max_in_flight = max_in_flight
+        self.limits = {
+            PRIORITY_LOW: max(1, int(max_in_flight * low_ratio)),
+            PRIORITY_NORMAL: max(1, int(max_in_flight * normal_ratio)),
+            PRIORITY_HIGH: max_in_flight,
+        }
+        self.pool_wait_limits = {
+            PRIORITY_LOW: low_pool_wait,
+            PRIORITY_NORMAL: normal_pool_wait,
+            PRIORITY_HIGH: None,
+        }
+        self.retry_after = {
+            PRIORITY_LOW: low_retry_after,
+            PRIORITY_NORMAL: normal_retry_after,
+            PRIORITY_HIGH: 1,
+        }
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._pool_wait = _Ewma()
+        self._routes = {}
+
+    def _route(self, endpoint):
+        stats = self._routes.get(endpoint)
+        if stats is None:
+            stats = self._routes[endpoint] = _RouteStats(ROUTE_PRIORITIES.get(endpoint, PRIORITY_NORMAL))
+        return stats
+
+    def try_admit(self, endpoint):
+        """받으면 None, 버려야 하면 Retry-After 초를 돌려준다."""
+        now = time.monotonic()
+        with self._lock:
+            stats = self._route(endpoint)
+            priority = stats.priority
+            pool_wait_limit = self.pool_wait_limits[priority]
+            overloaded = (self._in_flight >= self.limits[priority] or
+                          (pool_wait_limit is not None and self._pool_wait.current(now) >= pool_wait_limit))
+            if overloaded:
+                stats.shed += 1
+                return self.retry_after[priority]
+            self._in_flight += 1
+            stats.in_flight += 1
+            stats.admitted += 1
+            return None
+
+    def release(self, endpoint, duration, pool_wait):
+        now = time.monotonic()
+        with self._lock:
+            stats = self._route(endpoint)
+            self._in_flight -= 1
+            stats.in_flight -= 1
+            stats.latency.add(duration, now)
+            if pool_wait is not None:
+                stats.pool_wait.add(pool_wait, now)
+                self._pool_wait.add(pool_wait, now)
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'in_flight': self._in_flight,
+                'max_in_flight': self.max_in_flight,
+                'limits': {PRIORITY_NAMES[p]: limit for p, limit in self.limits.items()},
+                'pool_wait_ewma_ms': round(self._pool_wait.current(now) * 1000, 2),
+                'routes': {
+                    endpoint: {
+                        'priority': PRIORITY_NAMES[stats.priority],
+                        'in_flight': stats.in_flight,
+                        'admitted': stats.admitted,
+                        'shed': stats.shed,
+                        'latency_ewma_ms': round(stats.latency.current(now) * 1000, 2),
+                        'pool_wait_ewma_ms': round(stats.pool_wait.current(now) * 1000, 2),
+                    }
+                    for endpoint, stats in sorted(self._routes.items())
+                }
+            }
+
+
+class TimedQueuePool(QueuePool):
+    """커넥션을 받기까지 걸린 시간을 지금 처리 중인 요청(g)에 더해 두는 QueuePool."""
+
+    def connect(self):
+        started = time.monotonic()
+        try:
+            return super().connect()
+        finally:
+            if has_request_context():
+                g.admission_pool_wait = g.get('admission_pool_wait', 0.0) + (time.monotonic() - started)
+
+
+def init_app(app, db):
+    controller = AdmissionController(
+        max_in_flight=app.config.get('ADMISSION_MAX_IN_FLIGHT', int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', '8'))),
+    )
+    app.extensions['admission'] = controller
+
+    # 이미 만들어진 QueuePool 의 클래스만 바꾼다. dispose() 후 새로 만드는 풀도 같은 클래스를 쓴다.
+    with app.app_context():
+        for engine in db.engines.values():
+            if type(engine.pool) is QueuePool:
+                engine.pool.__class__ = TimedQueuePool
+
+    @app.before_request
+    def admit_request():
+        endpoint = request.endpoint
+        if endpoint is None or endpoint in EXEMPT_ENDPOINTS:
+            return None
+        retry_after = controller.try_admit(endpoint)
+        if retry_after is not None:
+            response = jsonify({"message": "요청이 많아 잠시 후 다시 시도해주세요.", "retry_after": retry_after})
+            response.status_code = 503
+            response.headers['Retry-After'] = str(retry_after)
+            return response
+        g.admission_endpoint = endpoint
+        g.admission_started = time.monotonic()
+        return None
+
+    @app.teardown_request
+    def release_request(exc):
+        endpoint = g.pop('admission_endpoint', None)
+        if endpoint is None:
+            return
+        controller.release(endpoint, time.monotonic() - g.pop('admission_started'),
+                           g.pop('admission_pool_wait', None))
+
+    @app.route('/api/admission', endpoint='admission_state')
+    @login_required
+    def admission_state():
+        if not current_user.is_admin:
+            return jsonify({"message": "관리자만 볼 수 있습니다."}), 403
+        return jsonify(controller.snapshot()), 200
+
+    return controller
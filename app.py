@@ -1,31 +1,68 @@
-from flask import Flask, request, jsonify, render_template_string, render_template, redirect, url_for, flash, session
+from flask import Blueprint, Flask, Response, current_app, request, jsonify, render_template_string, render_template, redirect, url_for, flash, session, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
+from collections import OrderedDict, deque
 from datetime import datetime, date, timedelta
+import atexit
+import csv
+import io
+import json
 import os
+import random
+import threading
+import time
+import uuid
+import weakref
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
+from sqlalchemy import and_, func, insert, inspect, or_, select, text, true, update
 from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 
-# --- 1. Flask 앱 설정 ---
-app = Flask(__name__)
-
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL') or 'sqlite:///site_data.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+import admission
+import http_cache
+from change_bus import change_bus
 
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY') or 'your-super-duper-secret-key-please-change-me-12345'
-
-db = SQLAlchemy(app)
+# --- 1. Flask 앱 설정 ---
+# 앱은 create_app() 이 만든다 (맨 아래 11번 '앱 팩토리 / 초기화'). 여기서는 앱에 붙일 확장과 라우트만 정의하므로
+# 이 모듈을 import 해도 DB 에 접속하거나 앱을 만들지 않는다.
+db = SQLAlchemy()
 
-CORS(app)
+bp = Blueprint('main', __name__, cli_group=None)
 
 # --- 2. Flask-Login 설정 ---
 login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login_page'
+login_manager.login_view = 'main.login_page'
 login_manager.login_message = "로그인 해주세요."
 login_manager.login_message_category = "info"
 
+# --- 3. 룰렛 규칙 ---
+# 반(Room)에 속하지 않은 사람과 새로 만드는 반의 기본값. 반마다 따로 바꿀 수 있다.
+ROULETTE_WIN_RATE = 0.3  # 당첨 확률 (spin_roulette 에서 서버가 정한다)
+STARS_PER_TICKET = 2     # 별점이 이만큼 모이면 룰렛권 1개로 바뀜
+
+class Room(db.Model):
+    """반(교실). 사람 목록/룰렛 규칙/상품 재고가 반마다 따로다."""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(80), unique=True, nullable=False)
+    win_rate = db.Column(db.Float, default=ROULETTE_WIN_RATE, nullable=False)
+    stars_per_ticket = db.Column(db.Integer, default=STARS_PER_TICKET, nullable=False)
+    prize_stock = db.Column(db.Integer, nullable=True)  # None 이면 재고 제한 없음
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+
+    def to_dict(self, member_count=None):
+        data = {
+            'id': self.id,
+            'name': self.name,
+            'win_rate': self.win_rate,
+            'stars_per_ticket': self.stars_per_ticket,
+            'prize_stock': self.prize_stock
+        }
+        if member_count is not None:
+            data['member_count'] = member_count
+        return data
+
 class Person(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(80), unique=True, nullable=False)
@@ -34,6 +71,14 @@ class Person(db.Model, UserMixin):
     is_admin = db.Column(db.Boolean, default=False, nullable=False)
     stars = db.Column(db.Integer, default=0, nullable=False)
     last_star_reset_date = db.Column(db.Date, default=date.today)
+    # 룰렛권/별점이 바뀔 때마다 1씩 올라가는 버전. update_balance 가 비교 후 교체(CAS)에 쓴다.
+    version = db.Column(db.Integer, default=1, server_default='1', nullable=False)
+    room_id = db.Column(db.Integer, db.ForeignKey('room.id'), nullable=True)
+    # 반 규칙이 필요한 곳(스핀, 별점 전환, 룰렛 화면)에서만 joinedload(Person.room) 으로 같이 읽는다.
+    # 매 요청 load_user 까지 room 을 JOIN 하지 않도록 기본은 lazy select.
+    room = db.relationship('Room')
+    # 반별 목록은 WHERE room_id = ? ORDER BY id 로 읽으므로 (room_id, id) 인덱스 하나로 충분하다
+    __table_args__ = (db.Index('ix_person_room_id_id', 'room_id', 'id'),)
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -56,48 +101,298 @@ class Person(db.Model, UserMixin):
     def get_id(self):
         return str(self.id)
 
+    @property
+    def win_rate(self):
+        return self.room.win_rate if self.room else ROULETTE_WIN_RATE
+
+    @property
+    def stars_per_ticket(self):
+        return self.room.stars_per_ticket if self.room else STARS_PER_TICKET
+
     def __repr__(self):
         return f'<Person {self.name} Admin: {self.is_admin} Tickets: {self.tickets} Stars: {self.stars}>'
 
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'tickets': self.tickets,
+            'is_admin': self.is_admin,
+            'stars': self.stars,
+            'room_id': self.room_id
+        }
+
 @login_manager.user_loader
 def load_user(user_id):
     return Person.query.get(int(user_id))
 
+# --- 룰렛권/별점 변경 (낙관적 동시성 제어) ---
+# 행을 읽고 -> 파이썬에서 값을 바꾸고 -> 커밋하면 관리자 클릭과 사용자 스핀이 동시에 들어왔을 때
+# 한쪽 변경이 사라진다. 그래서 잠금(SELECT ... FOR UPDATE) 대신
+#   UPDATE person SET ..., version = v + 1 WHERE id = :id AND version = v
+# 로 "읽은 뒤 아무도 안 바꿨을 때만" 쓰고, 누가 먼저 바꿨으면 다시 읽어서 정해진 횟수만큼 재시도한다.
+BALANCE_UPDATE_RETRIES = 8
+BALANCE_RETRY_BASE_DELAY = 0.005  # 초, 재시도마다 두 배 + 랜덤 지터
+
+class BalanceRejected(Exception):
+    """현재 잔액으로는 할 수 없는 변경 (예: 룰렛권 0개에서 차감)."""
+
+class BalanceConflict(Exception):
+    """재시도를 다 써도 다른 요청과 계속 충돌한 경우."""
+
+def update_balance(person_id, change, before_commit=None):
+    """
+    change(person) 가 돌려준 {'tickets': .., 'stars': ..} 를 CAS UPDATE 로 반영하고 최신 Person 을 돌려준다.
+
+    사람이 없으면 None. change 가 None 을 돌려주면 바꿀 것이 없다는 뜻이라 그대로 돌려준다.
+    change 는 재시도할 때마다 새로 읽은 값으로 다시 불리므로 부작용이 없어야 한다.
+    before_commit(person) 은 CAS 가 성공한 뒤 커밋 직전에 같은 트랜잭션 안에서 한 번만 불린다.
+    예외를 던지면 잔액 변경까지 함께 롤백된다.
+    """
+    for attempt in range(BALANCE_UPDATE_RETRIES):
+        # change 와 before_commit 이 반 규칙(별점 기준, 당첨률, 재고)을 보므로 반도 같이 새로 읽는다
+        person = db.session.get(Person, person_id, populate_existing=True, options=[joinedload(Person.room)])
+        if person is None:
+            db.session.rollback()
+            return None
+
+        values = change(person)
+        if not values:
+            db.session.rollback()
+            return person
+
+        current_version = person.version
+        swapped = db.session.execute(
+            update(Person)
+            .where(Person.id == person_id, Person.version == current_version)
+            .values(version=current_version + 1, **values)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if swapped == 1:
+            change_bus.publish('person', **balance_change_fields(person, values, current_version + 1))
+            if before_commit is not None:
+                try:
+                    before_commit(person)
+                except Exception:
+                    db.session.rollback()
+                    raise
+            db.session.commit()
+            # 방금 쓴 값을 객체에 반영 (다시 SELECT 하지 않도록)
+            for key, value in values.items():
+                set_committed_value(person, key, value)
+            set_committed_value(person, 'version', current_version + 1)
+            return person
+
+        db.session.rollback()
+        time.sleep(balance_retry_delay(attempt))
+
+    raise BalanceConflict(f"Balance update for person {person_id} kept conflicting after {BALANCE_UPDATE_RETRIES} attempts")
+
+def balance_retry_delay(attempt):
+    return BALANCE_RETRY_BASE_DELAY * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+def balance_change_fields(person, values, new_version):
+    """change_bus 'person' 이벤트 내용 (asgi.py 의 async 경로도 같은 형식으로 보낸다)."""
+    return {'id': person.id,
+            'r': person.room_id,
+            't': values.get('tickets', person.tickets),
+            's': values.get('stars', person.stars),
+            'v': new_version}
+
+def _convert_stars(tickets, stars, stars_per_ticket):
+    if stars >= stars_per_ticket:
+        return tickets + 1, 0
+    return tickets, stars
+
+def give_ticket_change(person):
+    return {'tickets': person.tickets + 1}
+
+def remove_ticket_change(person):
+    if person.tickets <= 0:
+        raise BalanceRejected("룰렛권이 이미 0개입니다.")
+    return {'tickets': person.tickets - 1}
+
+def give_star_change(person):
+    # 별점을 주면서 바로 룰렛권 전환까지 한 번의 CAS 로 처리한다
+    tickets, stars = _convert_stars(person.tickets, person.stars + 1, person.stars_per_ticket)
+    return {'tickets': tickets, 'stars': stars}
+
+def remove_star_change(person):
+    if person.stars <= 0:
+        raise BalanceRejected("별점이 이미 0개입니다.")
+    return {'stars': person.stars - 1}
+
+def spin_ticket_change(person):
+    if person.tickets <= 0:
+        raise BalanceRejected(f"{person.name}님은 룰렛권이 없습니다.")
+    return {'tickets': person.tickets - 1}
+
+def convert_stars_change(person):
+    if person.stars < person.stars_per_ticket:
+        return None
+    tickets, stars = _convert_stars(person.tickets, person.stars, person.stars_per_ticket)
+    return {'tickets': tickets, 'stars': stars}
+
+def claim_prize_statement(room_id):
+    """반의 상품 재고가 남아 있을 때만 1개 줄인다. rowcount 가 0 이면 이미 소진."""
+    return update(Room).where(Room.id == room_id, Room.prize_stock > 0).values(prize_stock=Room.prize_stock - 1)
+
 def check_and_reset_stars(person):
-    today = date.today()
-    
-    if person.stars >= 2:
-        person.tickets += 1
-        person.stars = 0
-        db.session.commit()
-        print(f"[{person.name}]의 별점 2개가 모여 룰렛권 1개가 지급되었습니다! (남은 룰렛권: {person.tickets})")
+    if person.stars < person.stars_per_ticket:
+        return person
+    # 다른 요청이 먼저 바꿔 놓았으면 convert_stars_change 가 None 을 돌려주고 아무것도 쓰지 않는다.
+    # 마지막으로 읽은 값에서 실제로 바꿨을 때만 지급 메시지를 남긴다.
+    converted = {}
+
+    def change(current):
+        converted['values'] = convert_stars_change(current)
+        return converted['values']
+
+    person = update_balance(person.id, change)
+    if person is not None and converted.get('values'):
+        print(f"[{person.name}]의 별점 {person.stars_per_ticket}개가 모여 룰렛권 1개가 지급되었습니다! (남은 룰렛권: {person.tickets})")
+    return person
+
+# --- 반별 사람 목록 스냅샷 (룰렛 화면 첫 렌더링, /api/get_people) ---
+# 매번 목록을 다시 읽지 않도록, 필요한 컬럼만 뽑은 결과를 같은 반 사용자들이 같이 쓴다.
+# 반마다 따로 캐시하므로 한 반의 목록을 만들고 고치는 비용은 그 반 인원에만 비례한다. (반이 없는 사람은 room_id=None)
+# 값이 바뀌면 change_bus 이벤트로 해당 사람만 고치거나 그 반(또는 전체)을 버린다.
+# Postgres 면 다른 워커/호스트의 변경도 이벤트로 오므로 오래 캐시하고,
+# SQLite 처럼 이벤트가 프로세스 안에서만 돌 때는 다른 워커의 변경을 놓칠 수 있어 짧게만 캐시한다.
+PEOPLE_SNAPSHOT_TTL = 2.0
+PEOPLE_SNAPSHOT_TTL_DISTRIBUTED = 60.0
+_people_snapshots = {}             # room_id -> {'people', 'index', 'versions', 'expires_at'}
+_people_snapshot_generations = {}  # room_id -> 그 반에 변경 이벤트가 온 횟수
+_people_snapshot_state = {'epoch': 0}  # 전체 무효화 횟수
+_person_rooms = {}                 # person_id -> room_id (스냅샷을 만들 때 본 값)
+_people_snapshot_lock = threading.Lock()
+
+def people_snapshot_query(room_id):
+    room_filter = Person.room_id.is_(None) if room_id is None else Person.room_id == room_id
+    return select(Person.id, Person.name, Person.tickets, Person.is_admin, Person.stars, Person.version) \
+        .where(room_filter).order_by(Person.id)
+
+def _people_snapshot_generation(room_id):
+    return _people_snapshot_state['epoch'], _people_snapshot_generations.get(room_id, 0)
+
+def cached_people_snapshot(room_id):
+    """
+    (people, index, generation). 아직 유효하면 people 과 {id: 위치} index 를, 새로 만들어야 하면
+    people=None 과 지금 세대 번호를 돌려준다. 새로 읽은 결과는 그 세대 번호와 함께 store_people_snapshot 에 넘긴다.
+    """
+    with _people_snapshot_lock:
+        snapshot = _people_snapshots.get(room_id)
+        if snapshot is not None and time.monotonic() < snapshot['expires_at']:
+            return snapshot['people'], snapshot['index'], None
+        return None, None, _people_snapshot_generation(room_id)
+
+def store_people_snapshot(room_id, rows, generation):
+    """people_snapshot_query(room_id) 결과로 (people, index) 를 만들고, 그 사이 변경이 없었으면 캐시에 저장한다."""
+    people = [{'id': r.id, 'name': r.name, 'tickets': r.tickets, 'is_admin': r.is_admin, 'stars': r.stars}
+              for r in rows]
+    index = {r.id: i for i, r in enumerate(rows)}
+    with _people_snapshot_lock:
+        # 읽는 동안 변경 이벤트가 왔으면 이 결과는 이미 낡았을 수 있으니 저장하지 않는다
+        if _people_snapshot_generation(room_id) == generation:
+            ttl = PEOPLE_SNAPSHOT_TTL_DISTRIBUTED if change_bus.is_distributed else PEOPLE_SNAPSHOT_TTL
+            _people_snapshots[room_id] = {
+                'people': people,
+                'index': index,
+                'versions': {r.id: r.version for r in rows},
+                'expires_at': time.monotonic() + ttl
+            }
+            for r in rows:
+                _person_rooms[r.id] = room_id
+    return people, index
+
+def get_people_snapshot(room_id):
+    people, index, generation = cached_people_snapshot(room_id)
+    if people is None:
+        people, index = store_people_snapshot(
+            room_id, db.session.execute(people_snapshot_query(room_id)).all(), generation)
+    return people
+
+def cached_person_room(person_id):
+    """스냅샷으로 알고 있는 사람의 반. 모르면 (False, None), 알면 (True, room_id)."""
+    with _people_snapshot_lock:
+        if person_id in _person_rooms:
+            return True, _person_rooms[person_id]
+    return False, None
+
+def apply_change_to_people_snapshot(change):
+    if change['k'] in ('spin', 'spins'):
+        return  # 스핀 기록 이벤트는 목록과 상관없다
+    with _people_snapshot_lock:
+        if change['k'] not in ('person', 'people') or 'r' not in change:
+            # 어느 반인지 모르는 변경 (캠페인, 가져오기, 반 이동, 재연결) -> 전부 버린다
+            _people_snapshot_state['epoch'] += 1
+            _people_snapshots.clear()
+            _person_rooms.clear()
+            return
+
+        room_id = change['r']
+        _people_snapshot_generations[room_id] = _people_snapshot_generations.get(room_id, 0) + 1
+        snapshot = _people_snapshots.get(room_id)
+        if snapshot is None:
+            return
+        index = snapshot['index'].get(change.get('id')) if change['k'] == 'person' else None
+        if index is None:
+            del _people_snapshots[room_id]
+            return
+        if snapshot['versions'][change['id']] >= change['v']:
+            return  # 이미 더 새로운 값을 가지고 있다 (이벤트 순서가 뒤바뀐 경우)
+        # 읽는 쪽이 잠금 없이 리스트를 그대로 쓰므로 고칠 때는 복사본을 만들어 바꿔 끼운다
+        people = list(snapshot['people'])
+        people[index] = dict(people[index], tickets=change['t'], stars=change['s'])
+        snapshot['people'] = people
+        snapshot['versions'][change['id']] = change['v']
+
+change_bus.subscribe(apply_change_to_people_snapshot)
+
+def upgrade_schema():
+    """create_all 은 기존 테이블에 컬럼을 추가하지 않으므로, 예전 DB 에 없는 컬럼만 채워 넣는다."""
+    columns = {c['name'] for c in inspect(db.engine).get_columns('person')}
+    if 'version' not in columns:
+        with db.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE person ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+        print("Added 'version' column to person table.")
+    if 'room_id' not in columns:
+        with db.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE person ADD COLUMN room_id INTEGER REFERENCES room(id)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_person_room_id_id ON person (room_id, id)"))
+        print("Added 'room_id' column to person table.")
+    run_columns = {c['name'] for c in inspect(db.engine).get_columns('campaign_run')}
+    if 'claim_token' not in run_columns:
+        with db.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE campaign_run ADD COLUMN claim_token VARCHAR(32)"))
+        print("Added 'claim_token' column to campaign_run table.")
 
 
 # --- 4. 웹 페이지 라우트 (HTML 파일 렌더링) ---
 
-@app.route('/login')
+@bp.route('/login')
 def login_page():
     if current_user.is_authenticated:
-        return redirect(url_for('roulette_page'))
+        return redirect(url_for('main.roulette_page'))
     return render_template('login.html')
 
-@app.route('/register')
+@bp.route('/register')
 @login_required
 def register_page():
     if not current_user.is_admin:
         flash("관리자만 사용자 등록 페이지에 접근할 수 있습니다.", "error")
-        return redirect(url_for('login_page'))
+        return redirect(url_for('main.login_page'))
     
     html_content = """
     """
     return render_template_string(html_content)
 
-@app.route('/admin')
+@bp.route('/admin')
 @login_required 
 def admin_page():
     if not current_user.is_admin:
         flash("관리자만 접근할 수 있는 페이지입니다.", "error")
-        return redirect(url_for('roulette_page')) 
+        return redirect(url_for('main.roulette_page')) 
 
     # ✨ 관리자 페이지에 별점/룰렛권 삭제 버튼을 추가하기 위해 JS 코드가 수정되었습니다.
     html_content = """
@@ -240,6 +535,107 @@ def admin_page():
                 transform: translateY(-3px); 
             }
 
+            /* 캠페인 */
+            .campaign-form select, .campaign-form input[type="number"], .campaign-form input[type="time"] {
+                padding: 12px;
+                border: 1px solid #ced4da;
+                border-radius: 8px;
+                margin-right: 10px;
+                font-size: 1em;
+            }
+            .campaign-form input[type="number"] { width: 80px; }
+            .campaign-list {
+                list-style-type: none;
+                padding: 0;
+                margin-top: 20px;
+                text-align: left;
+            }
+            .campaign-list li {
+                display: flex;
+                justify-content: space-between;
+                align-items: center;
+                padding: 10px 15px;
+                margin-bottom: 8px;
+                background-color: #f8f9fa;
+                border-radius: 8px;
+            }
+            .campaign-list li.inactive { color: #999; }
+
+            /* 사용 통계 */
+            .analytics-section select {
+                padding: 12px;
+                border: 1px solid #ced4da;
+                border-radius: 8px;
+                font-size: 1em;
+            }
+            .analytics-section table { margin-top: 15px; }
+            .analytics-section tbody tr:hover { transform: none; }
+
+            /* 반 관리 */
+            .room-form input, .room-form select, .list-controls select, #addUserRoomSelect {
+                padding: 12px;
+                border: 1px solid #ced4da;
+                border-radius: 8px;
+                font-size: 1em;
+                margin: 5px 5px 5px 0;
+            }
+            .room-form input[type="number"] { width: 130px; }
+            .room-list { list-style: none; padding: 0; margin-top: 15px; }
+            .room-list li {
+                display: flex;
+                justify-content: space-between;
+                align-items: center;
+                padding: 10px 0;
+                border-bottom: 1px solid #eee;
+            }
+
+            /* 가상 스크롤: 보이는 줄만 그리고 나머지는 위/아래 여백 줄로 높이만 채운다 */
+            .list-controls {
+                display: flex;
+                gap: 10px;
+                align-items: center;
+                margin-top: 20px;
+            }
+            .list-controls input[type="text"] {
+                flex: 1;
+                width: auto;
+                margin-right: 0;
+            }
+            .table-viewport {
+                height: 600px;
+                overflow-y: auto;
+                margin-top: 15px;
+                border-radius: 10px;
+            }
+            .table-viewport table {
+                margin-top: 0;
+            }
+            .table-viewport th {
+                position: sticky;
+                top: 0;
+                z-index: 1;
+                cursor: pointer;
+                user-select: none;
+            }
+            tbody tr.spacer-row,
+            tbody tr.spacer-row:hover {
+                box-shadow: none;
+                transform: none;
+            }
+            tbody tr.spacer-row td {
+                padding: 0;
+                border: none;
+                background-color: transparent;
+            }
+            td.action-cell {
+                white-space: nowrap;
+            }
+            .table-status {
+                margin-top: 10px;
+                color: #777;
+                font-size: 0.9em;
+            }
+
             /* 메시지 박스 */
             .message { 
                 margin-top: 25px; 
@@ -305,13 +701,13 @@ def admin_page():
                     text-align: left;
                 }
                 /* 모바일에서 액션 버튼들 정렬 */
-                td:nth-of-type(6) { 
+                td:nth-of-type(7) { 
                     text-align: center;
                     display: flex;
                     flex-wrap: wrap;
                     justify-content: center;
                 }
-                td:nth-of-type(6) button {
+                td:nth-of-type(7) button {
                     width: calc(50% - 10px);
                     margin: 5px;
                 }
@@ -328,27 +724,108 @@ def admin_page():
                 <h2>새로운 사용자(이름) 등록</h2>
                 <input type="text" id="addUserNameInput" class="add-user-input" placeholder="사용자 이름">
                 <input type="password" id="addUserPasswordInput" class="add-user-input" placeholder="비밀번호">
+                <select id="addUserRoomSelect">
+                    <option value="">반 없음</option>
+                </select>
                 <label><input type="checkbox" id="addIsAdmin"> 관리자 계정</label>
                 <button id="addUserButton" class="add-button">사용자 추가</button>
                 <p id="addUserMessage" class="message hidden"></p>
             </div>
 
-            <div class="list-section">
-                <h2>등록된 사용자 목록</h2>
-                <table id="personTable">
+            <div class="form-section room-form">
+                <h2>반 관리</h2>
+                <input type="text" id="roomNameInput" placeholder="반 이름">
+                <input type="number" id="roomWinRateInput" min="0" max="1" step="0.05" value="0.3" title="당첨률 (0~1)">
+                <input type="number" id="roomStarsPerTicketInput" min="1" value="2" title="룰렛권 1개에 필요한 별점">
+                <input type="number" id="roomPrizeStockInput" min="0" placeholder="상품 재고 (비우면 무제한)" title="상품 재고 (비우면 무제한)">
+                <button id="addRoomButton" class="add-button">반 만들기</button>
+                <p id="roomMessage" class="message hidden"></p>
+                <ul id="roomList" class="room-list"></ul>
+            </div>
+
+            <div class="form-section campaign-form">
+                <h2>룰렛권 캠페인 (예약 일괄 지급)</h2>
+                <input type="text" id="campaignNameInput" placeholder="캠페인 이름">
+                <select id="campaignTargetSelect">
+                    <option value="non_admin">관리자가 아닌 모든 사용자</option>
+                    <option value="zero_tickets">룰렛권이 0개인 사용자</option>
+                    <option value="all">모든 사용자</option>
+                </select>
+                <input type="number" id="campaignAmountInput" min="1" value="1" title="1인당 지급할 룰렛권">
+                <select id="campaignWeekdaySelect">
+                    <option value="">지금 한 번만</option>
+                    <option value="0">매주 월요일</option>
+                    <option value="1">매주 화요일</option>
+                    <option value="2">매주 수요일</option>
+                    <option value="3">매주 목요일</option>
+                    <option value="4">매주 금요일</option>
+                    <option value="5">매주 토요일</option>
+                    <option value="6">매주 일요일</option>
+                </select>
+                <input type="time" id="campaignTimeInput" value="09:00">
+                <button id="addCampaignButton" class="add-button">캠페인 등록</button>
+                <p id="campaignMessage" class="message hidden"></p>
+                <ul id="campaignList" class="campaign-list"></ul>
+            </div>
+
+            <div class="form-section">
+                <h2>사용자 내보내기 / 가져오기</h2>
+                <a href="/api/admin/export?format=csv"><button type="button" class="give-ticket-button">CSV 내보내기</button></a>
+                <a href="/api/admin/export?format=ndjson"><button type="button" class="give-ticket-button">NDJSON 내보내기</button></a>
+                <p></p>
+                <input type="file" id="importFileInput" accept=".csv,.ndjson,.jsonl">
+                <button id="importButton" class="add-button">가져오기</button>
+                <p id="importMessage" class="message hidden"></p>
+            </div>
+
+            <div class="form-section analytics-section">
+                <h2>사용 통계</h2>
+                <select id="analyticsGranularitySelect">
+                    <option value="hour">최근 24시간 (시간별)</option>
+                    <option value="day">최근 30일 (일별)</option>
+                </select>
+                <table id="analyticsTable">
                     <thead>
                         <tr>
-                            <th>ID</th>
-                            <th>이름</th>
-                            <th>관리자</th>
-                            <th>룰렛권</th>
-                            <th>별점</th>
-                            <th>액션</th>
+                            <th>구간</th>
+                            <th>스핀</th>
+                            <th>지급 룰렛권</th>
+                            <th>지급 별점</th>
+                            <th>로그인</th>
+                            <th>활동 사용자</th>
                         </tr>
                     </thead>
-                    <tbody>
-                        </tbody>
+                    <tbody></tbody>
                 </table>
+            </div>
+
+            <div class="list-section">
+                <h2>등록된 사용자 목록</h2>
+                <div class="list-controls">
+                    <input type="text" id="searchInput" placeholder="이름으로 검색">
+                    <select id="roomFilterSelect">
+                        <option value="">모든 반</option>
+                        <option value="none">반 없음</option>
+                    </select>
+                </div>
+                <div class="table-viewport" id="tableViewport">
+                    <table id="personTable">
+                        <thead>
+                            <tr>
+                                <th data-sort="id">ID</th>
+                                <th data-sort="name">이름</th>
+                                <th data-sort="is_admin">관리자</th>
+                                <th data-sort="tickets">룰렛권</th>
+                                <th data-sort="stars">별점</th>
+                                <th data-sort="room_id">반</th>
+                                <th>액션</th>
+                            </tr>
+                        </thead>
+                        <tbody>
+                            </tbody>
+                    </table>
+                </div>
+                <p id="tableStatus" class="table-status"></p>
                 <p id="listMessage" class="message hidden"></p>
             </div>
         </div>
@@ -361,6 +838,9 @@ def admin_page():
                 const addIsAdminCheckbox = document.getElementById('addIsAdmin');
                 const addUserButton = document.getElementById('addUserButton');
                 const personTableBody = document.querySelector('#personTable tbody');
+                const tableViewport = document.getElementById('tableViewport');
+                const tableStatusElement = document.getElementById('tableStatus');
+                const searchInput = document.getElementById('searchInput');
                 const addUserMessageElement = document.getElementById('addUserMessage');
                 const listMessageElement = document.getElementById('listMessage');
 
@@ -371,10 +851,15 @@ def admin_page():
                 const API_REMOVE_TICKET = API_BASE_URL + '/api/remove_ticket/';
                 const API_GIVE_STAR = API_BASE_URL + '/api/give_star/';
                 const API_REMOVE_STAR = API_BASE_URL + '/api/remove_star/';
-                const API_GET_PEOPLE = API_BASE_URL + '/api/get_people'; 
+                const API_ADMIN_PEOPLE = API_BASE_URL + '/api/admin/people';
                 const API_RESET_PASSWORD = API_BASE_URL + '/api/reset_password/'; 
                 const API_LOGOUT = API_BASE_URL + '/api/logout';
-
+                const API_CAMPAIGNS = API_BASE_URL + '/api/campaigns';
+                const API_ANALYTICS = API_BASE_URL + '/api/analytics';
+                const API_ROOMS = API_BASE_URL + '/api/rooms';
+                const roomFilterSelect = document.getElementById('roomFilterSelect');
+                const addUserRoomSelect = document.getElementById('addUserRoomSelect');
+                const roomNames = new Map(); // 반 ID -> 이름
 
                 function showMessage(element, text, type) {
                     element.textContent = text;
@@ -385,73 +870,229 @@ def admin_page():
                     }, 3000);
                 }
 
-                async function fetchPeople() {
+                // --- 가상 스크롤 테이블 ---
+                // 전체 목록을 받지 않고 PAGE_SIZE 단위로 서버에서 검색/정렬된 페이지만 가져온다.
+                // 화면에 보이는 줄(+ 위아래 OVERSCAN 줄)만 DOM 에 만들고, 나머지는 여백 줄 높이로 채운다.
+                const PAGE_SIZE = 100;
+                const OVERSCAN = 10;
+                let rowHeight = 70; // 첫 렌더링 후 실제 줄 높이로 다시 잰다
+                let totalRows = 0;
+                let sortKey = 'id';
+                let sortOrder = 'asc';
+                let searchText = '';
+                let roomFilter = '';
+                let generation = 0; // 검색/정렬이 바뀌면 증가 -> 늦게 도착한 이전 응답은 버린다
+                const pages = new Map(); // 페이지 번호 -> 사람 배열
+                const pendingPages = new Set();
+                const rowsById = new Map(); // 현재 DOM 에 있는 줄 (id -> tr)
+
+                function pageQuery(page) {
+                    const params = new URLSearchParams({
+                        q: searchText,
+                        room: roomFilter,
+                        sort: sortKey,
+                        order: sortOrder,
+                        offset: page * PAGE_SIZE,
+                        limit: PAGE_SIZE
+                    });
+                    return `${API_ADMIN_PEOPLE}?${params.toString()}`;
+                }
+
+                async function loadPage(page, force = false) {
+                    if ((!force && pages.has(page)) || pendingPages.has(page)) {
+                        return;
+                    }
+                    const requestGeneration = generation;
+                    pendingPages.add(page);
                     try {
-                        const response = await fetch(API_GET_PEOPLE); 
+                        const response = await fetch(pageQuery(page));
                         const data = await response.json();
-                        
-                        personTableBody.innerHTML = '';
-                        if (response.ok && data.people && data.people.length > 0) {
-                            data.people.forEach(person => {
-                                const row = personTableBody.insertRow();
-                                row.insertCell(0).setAttribute('data-label', 'ID:'); row.cells[0].textContent = person.id;
-                                row.insertCell(1).setAttribute('data-label', '이름:'); row.cells[1].textContent = person.name;
-                                row.insertCell(2).setAttribute('data-label', '관리자:'); row.cells[2].textContent = person.is_admin ? '✅' : '❌';
-                                row.insertCell(3).setAttribute('data-label', '룰렛권:'); row.cells[3].textContent = person.tickets;
-                                row.insertCell(4).setAttribute('data-label', '별점:'); row.cells[4].textContent = person.stars;
-                                
-                                const actionCell = row.insertCell(5);
-                                actionCell.setAttribute('data-label', '액션:');
-
-                                const giveStarBtn = document.createElement('button');
-                                giveStarBtn.textContent = '별점 주기';
-                                giveStarBtn.className = 'give-star-button';
-                                giveStarBtn.onclick = () => giveStar(person.id, person.name);
-                                actionCell.appendChild(giveStarBtn);
-
-                                const removeStarBtn = document.createElement('button');
-                                removeStarBtn.textContent = '별점 삭제';
-                                removeStarBtn.className = 'remove-star-button';
-                                removeStarBtn.onclick = () => removeStar(person.id, person.name);
-                                actionCell.appendChild(removeStarBtn);
-
-                                const giveTicketBtn = document.createElement('button');
-                                giveTicketBtn.textContent = '룰렛권 주기';
-                                giveTicketBtn.className = 'give-ticket-button';
-                                giveTicketBtn.onclick = () => giveTicket(person.id, person.name);
-                                actionCell.appendChild(giveTicketBtn);
-
-                                const removeTicketBtn = document.createElement('button');
-                                removeTicketBtn.textContent = '룰렛권 삭제';
-                                removeTicketBtn.className = 'remove-ticket-button';
-                                removeTicketBtn.onclick = () => removeTicket(person.id, person.name);
-                                actionCell.appendChild(removeTicketBtn);
-
-
-                                const resetPasswordBtn = document.createElement('button');
-                                resetPasswordBtn.textContent = '비밀번호 재설정';
-                                resetPasswordBtn.className = 'reset-password-button'; 
-                                resetPasswordBtn.onclick = () => resetPassword(person.id, person.name);
-                                actionCell.appendChild(resetPasswordBtn);
-
-                                const deleteBtn = document.createElement('button');
-                                deleteBtn.textContent = '삭제';
-                                deleteBtn.className = 'delete-button';
-                                deleteBtn.onclick = () => deletePerson(person.id, person.name);
-                                actionCell.appendChild(deleteBtn);
-                            });
-                        } else {
-                            const row = personTableBody.insertRow();
-                            const cell = row.insertCell(0);
-                            cell.colSpan = 6;
-                            cell.textContent = '등록된 사용자가 없습니다.';
+                        if (requestGeneration !== generation) {
+                            return;
                         }
+                        if (!response.ok) {
+                            showMessage(listMessageElement, `❌ 사용자 목록 불러오기 실패: ${data.message || '알 수 없는 에러'}`, 'error');
+                            return;
+                        }
+                        totalRows = data.total;
+                        pages.set(page, data.people);
+                        renderVisibleRows();
                     } catch (error) {
                         showMessage(listMessageElement, '🚫 사용자 목록 불러오기 실패: 네트워크 오류', 'error');
                         console.error('Error fetching people:', error);
+                    } finally {
+                        if (requestGeneration === generation) {
+                            pendingPages.delete(page);
+                        }
+                    }
+                }
+
+                function personAt(index) {
+                    const page = pages.get(Math.floor(index / PAGE_SIZE));
+                    return page ? page[index % PAGE_SIZE] : undefined;
+                }
+
+                function fillPersonRow(row, person) {
+                    row.cells[0].textContent = person.id;
+                    row.cells[1].textContent = person.name;
+                    row.cells[2].textContent = person.is_admin ? '✅' : '❌';
+                    row.cells[3].textContent = person.tickets;
+                    row.cells[4].textContent = person.stars;
+                    row.cells[5].textContent = person.room_id === null ? '-' : (roomNames.get(person.room_id) || person.room_id);
+                }
+
+                function buildPersonRow(person) {
+                    const row = document.createElement('tr');
+                    ['ID:', '이름:', '관리자:', '룰렛권:', '별점:', '반:'].forEach(label => {
+                        row.insertCell().setAttribute('data-label', label);
+                    });
+                    fillPersonRow(row, person);
+
+                    const actionCell = row.insertCell(6);
+                    actionCell.setAttribute('data-label', '액션:');
+                    actionCell.className = 'action-cell';
+
+                    const actions = [
+                        ['별점 주기', 'give-star-button', giveStar],
+                        ['별점 삭제', 'remove-star-button', removeStar],
+                        ['룰렛권 주기', 'give-ticket-button', giveTicket],
+                        ['룰렛권 삭제', 'remove-ticket-button', removeTicket],
+                        ['비밀번호 재설정', 'reset-password-button', resetPassword],
+                        ['반 이동', 'give-star-button', moveToRoom],
+                        ['삭제', 'delete-button', deletePerson]
+                    ];
+                    actions.forEach(([text, className, handler]) => {
+                        const button = document.createElement('button');
+                        button.textContent = text;
+                        button.className = className;
+                        button.onclick = () => handler(person.id, person.name);
+                        actionCell.appendChild(button);
+                    });
+                    return row;
+                }
+
+                function buildPlaceholderRow(text) {
+                    const row = document.createElement('tr');
+                    const cell = row.insertCell(0);
+                    cell.colSpan = 7;
+                    cell.textContent = text;
+                    return row;
+                }
+
+                function buildSpacerRow(height) {
+                    const row = document.createElement('tr');
+                    row.className = 'spacer-row';
+                    const cell = row.insertCell(0);
+                    cell.colSpan = 7;
+                    cell.style.height = `${height}px`;
+                    return row;
+                }
+
+                function renderVisibleRows() {
+                    const first = Math.max(0, Math.floor(tableViewport.scrollTop / rowHeight) - OVERSCAN);
+                    const visibleCount = Math.ceil(tableViewport.clientHeight / rowHeight) + OVERSCAN * 2;
+                    const last = Math.min(totalRows, first + visibleCount);
+
+                    for (let page = Math.floor(first / PAGE_SIZE); page <= Math.floor(Math.max(last - 1, 0) / PAGE_SIZE); page++) {
+                        loadPage(page);
+                    }
+
+                    const fragment = document.createDocumentFragment();
+                    rowsById.clear();
+                    fragment.appendChild(buildSpacerRow(first * rowHeight));
+                    for (let index = first; index < last; index++) {
+                        const person = personAt(index);
+                        if (person) {
+                            const row = buildPersonRow(person);
+                            rowsById.set(person.id, row);
+                            fragment.appendChild(row);
+                        } else {
+                            fragment.appendChild(buildPlaceholderRow('불러오는 중...'));
+                        }
+                    }
+                    fragment.appendChild(buildSpacerRow(Math.max(0, totalRows - last) * rowHeight));
+
+                    if (totalRows === 0 && pages.has(0)) {
+                        fragment.appendChild(buildPlaceholderRow(searchText || roomFilter ? '검색 결과가 없습니다.' : '등록된 사용자가 없습니다.'));
+                    }
+
+                    personTableBody.replaceChildren(fragment);
+                    tableStatusElement.textContent = `총 ${totalRows}명`;
+                    measureRowHeight();
+                }
+
+                function measureRowHeight() {
+                    const rows = Array.from(rowsById.values());
+                    if (rows.length < 2) {
+                        return;
+                    }
+                    const measured = rows[1].offsetTop - rows[0].offsetTop;
+                    if (measured > 0 && Math.abs(measured - rowHeight) > 1) {
+                        rowHeight = measured;
+                        renderVisibleRows();
+                    }
+                }
+
+                // 검색/정렬이 바뀌거나 사용자가 추가/삭제되면 캐시를 비우고 보이는 영역부터 다시 받는다
+                function reloadTable() {
+                    generation++;
+                    pages.clear();
+                    pendingPages.clear();
+                    loadPage(Math.floor(Math.floor(tableViewport.scrollTop / rowHeight) / PAGE_SIZE));
+                    renderVisibleRows();
+                }
+
+                // 변경 API 응답에 담긴 사람 정보로 캐시와 해당 줄만 고친다
+                function updatePersonRow(person) {
+                    if (!person) {
+                        return;
+                    }
+                    pages.forEach(page => {
+                        const index = page.findIndex(p => p.id === person.id);
+                        if (index !== -1) {
+                            page[index] = person;
+                        }
+                    });
+                    const row = rowsById.get(person.id);
+                    if (row) {
+                        fillPersonRow(row, person);
                     }
                 }
 
+                let scrollFrame = null;
+                tableViewport.addEventListener('scroll', () => {
+                    if (scrollFrame === null) {
+                        scrollFrame = requestAnimationFrame(() => {
+                            scrollFrame = null;
+                            renderVisibleRows();
+                        });
+                    }
+                });
+
+                let searchTimer = null;
+                searchInput.addEventListener('input', () => {
+                    clearTimeout(searchTimer);
+                    searchTimer = setTimeout(() => {
+                        searchText = searchInput.value.trim();
+                        tableViewport.scrollTop = 0;
+                        reloadTable();
+                    }, 300);
+                });
+
+                document.querySelectorAll('#personTable th[data-sort]').forEach(th => {
+                    th.addEventListener('click', () => {
+                        const key = th.dataset.sort;
+                        sortOrder = (sortKey === key && sortOrder === 'asc') ? 'desc' : 'asc';
+                        sortKey = key;
+                        document.querySelectorAll('#personTable th[data-sort]').forEach(other => {
+                            other.textContent = other.textContent.replace(/ [▲▼]$/, '');
+                        });
+                        th.textContent += sortOrder === 'asc' ? ' ▲' : ' ▼';
+                        tableViewport.scrollTop = 0;
+                        reloadTable();
+                    });
+                });
+
                 // ✨ 새로운 별점 삭제 함수
                 async function removeStar(personId, personName) {
                     if (!confirm(`'${personName}' 님의 별점 1개를 삭제하시겠습니까?`)) {
@@ -467,7 +1108,7 @@ def admin_page():
 
                         if (response.ok) {
                             showMessage(listMessageElement, `✅ '${personName}' 님의 별점 1개 삭제 성공! (총 ${data.stars}개)`, 'success');
-                            fetchPeople();
+                            updatePersonRow(data.person);
                         } else {
                             showMessage(listMessageElement, `❌ 별점 삭제 실패: ${data.message || '알 수 없는 에러'}`, 'error');
                         }
@@ -492,7 +1133,7 @@ def admin_page():
 
                         if (response.ok) {
                             showMessage(listMessageElement, `✅ '${personName}' 님의 룰렛권 1개 삭제 성공! (총 ${data.tickets}개)`, 'success');
-                            fetchPeople();
+                            updatePersonRow(data.person);
                         } else {
                             showMessage(listMessageElement, `❌ 룰렛권 삭제 실패: ${data.message || '알 수 없는 에러'}`, 'error');
                         }
@@ -516,7 +1157,7 @@ def admin_page():
 
                         if (response.ok) {
                             showMessage(listMessageElement, `✅ '${personName}' 님에게 별점 1개 부여 성공! (총 ${data.stars}개)`, 'success');
-                            fetchPeople();
+                            updatePersonRow(data.person);
                         } else {
                             showMessage(listMessageElement, `❌ 별점 부여 실패: ${data.message || '알 수 없는 에러'}`, 'error');
                         }
@@ -540,7 +1181,7 @@ def admin_page():
 
                         if (response.ok) {
                             showMessage(listMessageElement, `✅ '${personName}' 님에게 룰렛권 1개 부여 성공! (총 ${data.tickets}개)`, 'success');
-                            fetchPeople();
+                            updatePersonRow(data.person);
                         } else {
                             showMessage(listMessageElement, `❌ 룰렛권 부여 실패: ${data.message || '알 수 없는 에러'}`, 'error');
                         }
@@ -556,6 +1197,7 @@ def admin_page():
                     const name = addUserNameInput.value.trim();
                     const password = addUserPasswordInput.value.trim();
                     const isAdmin = addIsAdminCheckbox.checked;
+                    const roomId = addUserRoomSelect.value === '' ? null : parseInt(addUserRoomSelect.value, 10);
 
                     if (!name || !password) {
                         showMessage(addUserMessageElement, '⚠️ 이름과 비밀번호를 모두 입력해주세요!', 'error');
@@ -571,7 +1213,7 @@ def admin_page():
                         const response = await fetch(API_ADD_PERSON, {
                             method: 'POST',
                             headers: { 'Content-Type': 'application/json' },
-                            body: JSON.stringify({ name: name, password: password, is_admin: isAdmin })
+                            body: JSON.stringify({ name: name, password: password, is_admin: isAdmin, room_id: roomId })
                         });
                         const data = await response.json();
 
@@ -580,7 +1222,8 @@ def admin_page():
                             addUserNameInput.value = '';
                             addUserPasswordInput.value = '';
                             addIsAdminCheckbox.checked = false;
-                            fetchPeople();
+                            reloadTable();
+                            fetchRooms();
                         } else {
                             showMessage(addUserMessageElement, `❌ 사용자 등록 실패: ${data.message || '알 수 없는 에러'}`, 'error');
                         }
@@ -637,7 +1280,7 @@ def admin_page():
 
                         if (response.ok) {
                             showMessage(listMessageElement, `✅ '${personName}' 님이 삭제되었습니다!`, 'success');
-                            fetchPeople();
+                            reloadTable();
                         } else {
                             showMessage(listMessageElement, `❌ 삭제 실패: ${data.message || '알 수 없는 에러'}`, 'error');
                         }
@@ -647,6 +1290,349 @@ def admin_page():
                     }
                 }
 
+                // --- 사용자 가져오기 ---
+                document.getElementById('importButton').addEventListener('click', async () => {
+                    const importMessageElement = document.getElementById('importMessage');
+                    const fileInput = document.getElementById('importFileInput');
+                    if (!fileInput.files.length) {
+                        showMessage(importMessageElement, '⚠️ 가져올 파일을 선택해주세요!', 'error');
+                        return;
+                    }
+                    const formData = new FormData();
+                    formData.append('file', fileInput.files[0]);
+                    showMessage(importMessageElement, '⏳ 가져오는 중...', 'success');
+                    try {
+                        const response = await fetch(API_BASE_URL + '/api/admin/import', { method: 'POST', body: formData });
+                        const data = await response.json();
+                        if (response.ok) {
+                            const firstErrors = data.errors.slice(0, 5).map(e => `${e.row}행 ${e.name || ''}: ${e.message}`).join(' / ');
+                            showMessage(importMessageElement, `✅ ${data.message}${firstErrors ? ' ' + firstErrors : ''}`, data.failed ? 'error' : 'success');
+                            fileInput.value = '';
+                            reloadTable();
+                        } else {
+                            showMessage(importMessageElement, `❌ 가져오기 실패: ${data.message || '알 수 없는 에러'}`, 'error');
+                        }
+                    } catch (error) {
+                        showMessage(importMessageElement, `🚫 네트워크 에러: ${error.message}`, 'error');
+                        console.error('Error importing people:', error);
+                    }
+                });
+
+                // --- 반 관리 ---
+                const roomListElement = document.getElementById('roomList');
+                const roomMessageElement = document.getElementById('roomMessage');
+
+                function describeRoom(room) {
+                    const stock = room.prize_stock === null ? '무제한' : `${room.prize_stock}개`;
+                    return `${room.name} · ${room.member_count}명 · 당첨률 ${Math.round(room.win_rate * 100)}% · 별점 ${room.stars_per_ticket}개당 룰렛권 1개 · 상품 재고 ${stock}`;
+                }
+
+                // 반 목록으로 반 관리 목록, 등록/검색용 선택 상자, 표의 '반' 열 이름을 함께 채운다
+                async function fetchRooms() {
+                    try {
+                        const response = await fetch(API_ROOMS);
+                        const data = await response.json();
+                        if (!response.ok) {
+                            return;
+                        }
+                        roomNames.clear();
+                        const fragment = document.createDocumentFragment();
+                        data.rooms.forEach(room => {
+                            roomNames.set(room.id, room.name);
+                            const item = document.createElement('li');
+                            const label = document.createElement('span');
+                            label.textContent = describeRoom(room);
+                            item.appendChild(label);
+
+                            const buttons = document.createElement('span');
+                            const editBtn = document.createElement('button');
+                            editBtn.textContent = '설정 변경';
+                            editBtn.className = 'give-ticket-button';
+                            editBtn.onclick = () => editRoom(room);
+                            buttons.appendChild(editBtn);
+                            const deleteBtn = document.createElement('button');
+                            deleteBtn.textContent = '삭제';
+                            deleteBtn.className = 'delete-button';
+                            deleteBtn.onclick = () => deleteRoom(room.id, room.name);
+                            buttons.appendChild(deleteBtn);
+                            item.appendChild(buttons);
+                            fragment.appendChild(item);
+                        });
+                        roomListElement.replaceChildren(fragment);
+
+                        [[roomFilterSelect, 2], [addUserRoomSelect, 1]].forEach(([select, fixedOptions]) => {
+                            const selected = select.value;
+                            while (select.options.length > fixedOptions) {
+                                select.remove(fixedOptions);
+                            }
+                            data.rooms.forEach(room => select.add(new Option(room.name, room.id)));
+                            select.value = Array.from(select.options).some(option => option.value === selected) ? selected : '';
+                        });
+                        renderVisibleRows();
+                    } catch (error) {
+                        console.error('Error fetching rooms:', error);
+                    }
+                }
+
+                async function saveRoom(url, method, payload, successText) {
+                    try {
+                        const response = await fetch(url, {
+                            method: method,
+                            headers: { 'Content-Type': 'application/json' },
+                            body: JSON.stringify(payload)
+                        });
+                        const data = await response.json();
+                        if (response.ok) {
+                            showMessage(roomMessageElement, `✅ ${successText || data.message}`, 'success');
+                            fetchRooms();
+                            return true;
+                        }
+                        showMessage(roomMessageElement, `❌ 반 저장 실패: ${data.message || '알 수 없는 에러'}`, 'error');
+                    } catch (error) {
+                        showMessage(roomMessageElement, `🚫 네트워크 에러: ${error.message}`, 'error');
+                        console.error('Error saving room:', error);
+                    }
+                    return false;
+                }
+
+                document.getElementById('addRoomButton').addEventListener('click', async () => {
+                    const nameInput = document.getElementById('roomNameInput');
+                    const name = nameInput.value.trim();
+                    if (!name) {
+                        showMessage(roomMessageElement, '⚠️ 반 이름을 입력해주세요!', 'error');
+                        return;
+                    }
+                    const created = await saveRoom(API_ROOMS, 'POST', {
+                        name: name,
+                        win_rate: parseFloat(document.getElementById('roomWinRateInput').value),
+                        stars_per_ticket: parseInt(document.getElementById('roomStarsPerTicketInput').value, 10),
+                        prize_stock: document.getElementById('roomPrizeStockInput').value
+                    });
+                    if (created) {
+                        nameInput.value = '';
+                    }
+                });
+
+                async function editRoom(room) {
+                    const winRate = prompt(`'${room.name}' 반의 당첨률 (0~1):`, room.win_rate);
+                    if (winRate === null) {
+                        return;
+                    }
+                    const starsPerTicket = prompt('룰렛권 1개에 필요한 별점:', room.stars_per_ticket);
+                    if (starsPerTicket === null) {
+                        return;
+                    }
+                    const prizeStock = prompt('상품 재고 (비우면 무제한):', room.prize_stock === null ? '' : room.prize_stock);
+                    if (prizeStock === null) {
+                        return;
+                    }
+                    await saveRoom(`${API_ROOMS}/${room.id}`, 'PATCH', {
+                        win_rate: parseFloat(winRate),
+                        stars_per_ticket: parseInt(starsPerTicket, 10),
+                        prize_stock: prizeStock.trim()
+                    });
+                }
+
+                async function deleteRoom(roomId, roomName) {
+                    if (!confirm(`'${roomName}' 반을 삭제하시겠습니까? 반에 있던 사용자는 '반 없음'이 됩니다.`)) {
+                        return;
+                    }
+                    try {
+                        const response = await fetch(`${API_ROOMS}/${roomId}`, { method: 'DELETE' });
+                        const data = await response.json();
+                        if (response.ok) {
+                            showMessage(roomMessageElement, `✅ ${data.message}`, 'success');
+                            fetchRooms();
+                            reloadTable();
+                        } else {
+                            showMessage(roomMessageElement, `❌ 반 삭제 실패: ${data.message || '알 수 없는 에러'}`, 'error');
+                        }
+                    } catch (error) {
+                        showMessage(roomMessageElement, `🚫 네트워크 에러: ${error.message}`, 'error');
+                        console.error('Error deleting room:', error);
+                    }
+                }
+
+                async function moveToRoom(personId, personName) {
+                    const choices = Array.from(roomNames, ([id, name]) => `${id}: ${name}`).join('\\n');
+                    const answer = prompt(`'${personName}' 님을 옮길 반 ID를 입력하세요 (비우면 반 없음)\\n${choices}`, '');
+                    if (answer === null) {
+                        return;
+                    }
+                    const roomId = answer.trim() === '' ? null : parseInt(answer, 10);
+                    if (roomId !== null && !roomNames.has(roomId)) {
+                        showMessage(listMessageElement, '⚠️ 목록에 있는 반 ID를 입력해주세요.', 'error');
+                        return;
+                    }
+                    try {
+                        const response = await fetch(`${API_ROOMS}/members`, {
+                            method: 'POST',
+                            headers: { 'Content-Type': 'application/json' },
+                            body: JSON.stringify({ room_id: roomId, person_ids: [personId] })
+                        });
+                        const data = await response.json();
+                        if (response.ok) {
+                            showMessage(listMessageElement, `✅ '${personName}' 님의 반을 바꿨습니다.`, 'success');
+                            reloadTable();
+                            fetchRooms();
+                        } else {
+                            showMessage(listMessageElement, `❌ 반 이동 실패: ${data.message || '알 수 없는 에러'}`, 'error');
+                        }
+                    } catch (error) {
+                        showMessage(listMessageElement, `🚫 네트워크 에러: ${error.message}`, 'error');
+                        console.error('Error moving person:', error);
+                    }
+                }
+
+                roomFilterSelect.addEventListener('change', () => {
+                    roomFilter = roomFilterSelect.value;
+                    tableViewport.scrollTop = 0;
+                    reloadTable();
+                });
+
+                // --- 룰렛권 캠페인 ---
+                const campaignListElement = document.getElementById('campaignList');
+                const campaignMessageElement = document.getElementById('campaignMessage');
+                const CAMPAIGN_TARGET_LABELS = {
+                    non_admin: '관리자가 아닌 모든 사용자',
+                    zero_tickets: '룰렛권 0개인 사용자',
+                    all: '모든 사용자'
+                };
+                const WEEKDAY_LABELS = ['월', '화', '수', '목', '금', '토', '일'];
+                const RUN_STATUS_LABELS = { pending: '대기 중', running: '실행 중', done: '완료', failed: '실패' };
+
+                function describeCampaign(campaign) {
+                    const schedule = campaign.weekday === null
+                        ? '한 번만'
+                        : `매주 ${WEEKDAY_LABELS[campaign.weekday]}요일 ${campaign.run_time}`;
+                    let text = `${campaign.name} · ${CAMPAIGN_TARGET_LABELS[campaign.target] || campaign.target}에게 ${campaign.amount}개 · ${schedule}`;
+                    if (!campaign.is_active) {
+                        text += ' · 중지됨';
+                    }
+                    const run = campaign.last_run;
+                    if (run) {
+                        text += ` · 최근 실행: ${RUN_STATUS_LABELS[run.status] || run.status}`;
+                        if (run.status === 'running') {
+                            text += ` ${Math.round(run.progress * 100)}%`;
+                        }
+                        if (run.status === 'done' || run.status === 'running') {
+                            text += ` (${run.processed_rows}명 지급)`;
+                        }
+                    }
+                    return text;
+                }
+
+                async function fetchCampaigns() {
+                    try {
+                        const response = await fetch(API_CAMPAIGNS);
+                        const data = await response.json();
+                        if (!response.ok) {
+                            return;
+                        }
+                        const fragment = document.createDocumentFragment();
+                        data.campaigns.forEach(campaign => {
+                            const item = document.createElement('li');
+                            if (!campaign.is_active) {
+                                item.classList.add('inactive');
+                            }
+                            const label = document.createElement('span');
+                            label.textContent = describeCampaign(campaign);
+                            item.appendChild(label);
+
+                            const buttons = document.createElement('span');
+                            const runBtn = document.createElement('button');
+                            runBtn.textContent = '지금 실행';
+                            runBtn.className = 'give-ticket-button';
+                            runBtn.onclick = () => runCampaignNow(campaign.id, campaign.name);
+                            buttons.appendChild(runBtn);
+                            if (campaign.is_active) {
+                                const stopBtn = document.createElement('button');
+                                stopBtn.textContent = '중지';
+                                stopBtn.className = 'delete-button';
+                                stopBtn.onclick = () => stopCampaign(campaign.id, campaign.name);
+                                buttons.appendChild(stopBtn);
+                            }
+                            item.appendChild(buttons);
+                            fragment.appendChild(item);
+                        });
+                        campaignListElement.replaceChildren(fragment);
+                    } catch (error) {
+                        console.error('Error fetching campaigns:', error);
+                    }
+                }
+
+                document.getElementById('addCampaignButton').addEventListener('click', async () => {
+                    const name = document.getElementById('campaignNameInput').value.trim();
+                    const weekdayValue = document.getElementById('campaignWeekdaySelect').value;
+                    const payload = {
+                        name: name,
+                        target: document.getElementById('campaignTargetSelect').value,
+                        amount: parseInt(document.getElementById('campaignAmountInput').value, 10),
+                        weekday: weekdayValue === '' ? null : parseInt(weekdayValue, 10),
+                        run_time: document.getElementById('campaignTimeInput').value
+                    };
+                    if (!name) {
+                        showMessage(campaignMessageElement, '⚠️ 캠페인 이름을 입력해주세요!', 'error');
+                        return;
+                    }
+                    try {
+                        const response = await fetch(API_CAMPAIGNS, {
+                            method: 'POST',
+                            headers: { 'Content-Type': 'application/json' },
+                            body: JSON.stringify(payload)
+                        });
+                        const data = await response.json();
+                        if (response.ok) {
+                            showMessage(campaignMessageElement, `✅ '${name}' 캠페인이 등록되었습니다!`, 'success');
+                            document.getElementById('campaignNameInput').value = '';
+                            fetchCampaigns();
+                        } else {
+                            showMessage(campaignMessageElement, `❌ 캠페인 등록 실패: ${data.message || '알 수 없는 에러'}`, 'error');
+                        }
+                    } catch (error) {
+                        showMessage(campaignMessageElement, `🚫 네트워크 에러: ${error.message}`, 'error');
+                        console.error('Error adding campaign:', error);
+                    }
+                });
+
+                async function runCampaignNow(campaignId, campaignName) {
+                    if (!confirm(`'${campaignName}' 캠페인을 지금 실행하시겠습니까?`)) {
+                        return;
+                    }
+                    try {
+                        const response = await fetch(`${API_CAMPAIGNS}/${campaignId}/run`, { method: 'POST' });
+                        const data = await response.json();
+                        if (response.ok) {
+                            showMessage(campaignMessageElement, `✅ ${data.message}`, 'success');
+                            fetchCampaigns();
+                        } else {
+                            showMessage(campaignMessageElement, `❌ 캠페인 실행 실패: ${data.message || '알 수 없는 에러'}`, 'error');
+                        }
+                    } catch (error) {
+                        showMessage(campaignMessageElement, `🚫 네트워크 에러: ${error.message}`, 'error');
+                        console.error('Error running campaign:', error);
+                    }
+                }
+
+                async function stopCampaign(campaignId, campaignName) {
+                    if (!confirm(`'${campaignName}' 캠페인을 중지하시겠습니까?`)) {
+                        return;
+                    }
+                    try {
+                        const response = await fetch(`${API_CAMPAIGNS}/${campaignId}`, { method: 'DELETE' });
+                        const data = await response.json();
+                        if (response.ok) {
+                            showMessage(campaignMessageElement, `✅ ${data.message}`, 'success');
+                            fetchCampaigns();
+                        } else {
+                            showMessage(campaignMessageElement, `❌ 캠페인 중지 실패: ${data.message || '알 수 없는 에러'}`, 'error');
+                        }
+                    } catch (error) {
+                        showMessage(campaignMessageElement, `🚫 네트워크 에러: ${error.message}`, 'error');
+                        console.error('Error stopping campaign:', error);
+                    }
+                }
+
                 window.logout = async () => {
                     try {
                         const response = await fetch(API_LOGOUT, { method: 'POST' });
@@ -661,8 +1647,59 @@ def admin_page():
                     }
                 };
 
-                fetchPeople();
-                setInterval(fetchPeople, 5000); 
+                const ANALYTICS_COLUMNS = ['spins', 'tickets_granted', 'stars_granted', 'logins', 'active_users'];
+                const analyticsGranularitySelect = document.getElementById('analyticsGranularitySelect');
+                const analyticsTableBody = document.querySelector('#analyticsTable tbody');
+
+                async function fetchAnalytics() {
+                    const granularity = analyticsGranularitySelect.value;
+                    try {
+                        const response = await fetch(`${API_ANALYTICS}?granularity=${granularity}`);
+                        if (!response.ok) {
+                            return;
+                        }
+                        const data = await response.json();
+                        const fragment = document.createDocumentFragment();
+                        // 최근 구간이 위로 오도록 거꾸로 그린다
+                        for (let i = data.buckets.length - 1; i >= 0; i--) {
+                            const row = document.createElement('tr');
+                            const label = document.createElement('td');
+                            const bucket = data.buckets[i];
+                            label.textContent = granularity === 'hour' ? bucket.slice(5, 16).replace('T', ' ') : bucket.slice(0, 10);
+                            row.appendChild(label);
+                            ANALYTICS_COLUMNS.forEach(metric => {
+                                const cell = document.createElement('td');
+                                cell.textContent = data.series[metric][i];
+                                row.appendChild(cell);
+                            });
+                            fragment.appendChild(row);
+                        }
+                        analyticsTableBody.replaceChildren(fragment);
+                    } catch (error) {
+                        console.error('Error fetching analytics:', error);
+                    }
+                }
+                analyticsGranularitySelect.addEventListener('change', fetchAnalytics);
+
+                fetchRooms();
+
+                fetchCampaigns();
+                setInterval(fetchCampaigns, 5000);
+
+                // 집계 테이블은 워커마다 1분에 한 번씩 채워지므로 자주 받을 필요가 없다
+                fetchAnalytics();
+                setInterval(fetchAnalytics, 60000);
+
+                reloadTable();
+                // 5초마다 전체 목록 대신 지금 보이는 페이지만 새로 받는다
+                setInterval(() => {
+                    const first = Math.floor(tableViewport.scrollTop / rowHeight);
+                    const firstPage = Math.floor(first / PAGE_SIZE);
+                    const lastPage = Math.floor((first + Math.ceil(tableViewport.clientHeight / rowHeight)) / PAGE_SIZE);
+                    for (let page = firstPage; page <= lastPage; page++) {
+                        loadPage(page, true);
+                    }
+                }, 5000);
             });
         </script>
     </body>
@@ -670,15 +1707,27 @@ def admin_page():
     """
     return render_template_string(html_content, current_user=current_user)
 
-@app.route('/')
+@bp.route('/')
 @login_required 
 def roulette_page():
-    check_and_reset_stars(current_user)
-    return render_template('index.html', current_user=current_user)
+    # 화면에 반 정보와 별점 기준이 필요하므로 반을 같이 읽는다 (load_user 는 사람만 읽는다)
+    person = db.session.get(Person, current_user.id, populate_existing=True, options=[joinedload(Person.room)])
+    try:
+        person = check_and_reset_stars(person)
+    except (BalanceConflict, BalanceRejected) as e:
+        # 별 -> 룰렛권 전환은 다음 요청에서 다시 하면 되므로, 화면은 지금 잔액 그대로 보여준다
+        print(f"Star conversion for {current_user.name} skipped: {e}")
+    # 첫 화면에 같은 반의 룰렛권 현황을 같이 넣어 보내서 페이지를 연 직후의 /api/get_people 요청을 없앤다
+    return render_template('index.html', current_user=current_user,
+                           room=person.room,
+                           initial_tickets=person.tickets,
+                           initial_stars=person.stars,
+                           initial_people=get_people_snapshot(person.room_id),
+                           initial_spins=get_recent_spins(person.id))
 
 # --- 5. API 엔드포인트 ---
 
-@app.route('/api/register', methods=['POST'])
+@bp.route('/api/register', methods=['POST'])
 def register_api():
     if not current_user.is_authenticated or not current_user.is_admin:
         return jsonify({"message": "관리자만 사용자를 등록할 수 있습니다."}), 403
@@ -687,20 +1736,24 @@ def register_api():
     name = data.get('name')
     password = data.get('password')
     is_admin = data.get('is_admin', False)
+    room_id = data.get('room_id')
 
     if not name or not password:
         return jsonify({"message": "아이디와 비밀번호를 모두 입력해주세요."}), 400
     if len(password) < 6:
         return jsonify({"message": "비밀번호는 최소 6자 이상이어야 합니다."}), 400
+    if room_id is not None and not db.session.get(Room, room_id):
+        return jsonify({"message": "해당 반을 찾을 수 없습니다."}), 404
     
     existing_person = Person.query.filter_by(name=name).first()
     if existing_person:
         return jsonify({"message": "이미 존재하는 아이디(이름)입니다."}), 409
 
     try:
-        new_person = Person(name=name, is_admin=is_admin)
+        new_person = Person(name=name, is_admin=is_admin, room_id=room_id)
         new_person.set_password(password) 
         db.session.add(new_person)
+        change_bus.publish('people', r=room_id)
         db.session.commit()
         print(f"Registered new user: {name} (Admin: {is_admin})")
         return jsonify({"message": "사용자가 성공적으로 등록되었습니다.", "user_id": new_person.id}), 201
@@ -709,7 +1762,7 @@ def register_api():
         print(f"Error registering user: {e}")
         return jsonify({"message": "서버 오류로 사용자 등록 실패", "details": str(e)}), 500
 
-@app.route('/api/login', methods=['POST'])
+@bp.route('/api/login', methods=['POST'])
 def login_api():
     data = request.get_json()
     name = data.get('name')
@@ -722,22 +1775,23 @@ def login_api():
 
     if user and user.check_password(password):
         login_user(user) 
+        record_usage('logins', user.id)
         print(f"User {user.name} logged in successfully.")
         if user.is_admin:
-            return jsonify({"message": "로그인 성공!", "redirect_url": url_for('admin_page')}), 200
+            return jsonify({"message": "로그인 성공!", "redirect_url": url_for('main.admin_page')}), 200
         else:
-            return jsonify({"message": "로그인 성공!", "redirect_url": url_for('roulette_page')}), 200
+            return jsonify({"message": "로그인 성공!", "redirect_url": url_for('main.roulette_page')}), 200
     else:
         return jsonify({"message": "잘못된 아이디 또는 비밀번호입니다."}), 401 
 
-@app.route('/api/logout', methods=['POST'])
+@bp.route('/api/logout', methods=['POST'])
 @login_required 
 def logout_api():
     logout_user() 
     print(f"User logged out.")
     return jsonify({"message": "로그아웃 되었습니다."}), 200
 
-@app.route('/api/reset_password/<int:person_id>', methods=['POST'])
+@bp.route('/api/reset_password/<int:person_id>', methods=['POST'])
 @login_required
 def reset_password_api(person_id):
     if not current_user.is_admin:
@@ -765,7 +1819,7 @@ def reset_password_api(person_id):
         print(f"Error resetting password for user (ID: {person_id}): {e}")
         return jsonify({"message": "서버 오류로 비밀번호 재설정 실패", "details": str(e)}), 500
 
-@app.route('/api/delete_person/<int:person_id>', methods=['DELETE'])
+@bp.route('/api/delete_person/<int:person_id>', methods=['DELETE'])
 @login_required
 def delete_person_api(person_id):
     if not current_user.is_admin:
@@ -779,7 +1833,13 @@ def delete_person_api(person_id):
         if person_to_delete.name == 'admin' and person_to_delete.is_admin:
             return jsonify({"message": "기본 관리자 계정은 삭제할 수 없습니다."}), 403
 
+        # SQLite 는 FK 의 ON DELETE CASCADE 를 기본으로 켜지 않으므로 스핀 기록은 직접 지운다
+        db.session.execute(
+            SpinHistory.__table__.delete().where(SpinHistory.person_id == person_id)
+        )
         db.session.delete(person_to_delete)
+        change_bus.publish('people', r=person_to_delete.room_id)
+        change_bus.publish('spins', id=person_id)
         db.session.commit()
         print(f"Deleted person: {person_to_delete.name} (ID: {person_id})")
         return jsonify({"message": "이름이 성공적으로 삭제되었습니다."}), 200
@@ -788,114 +1848,168 @@ def delete_person_api(person_id):
         print(f"Error deleting person (ID: {person_id}): {e}")
         return jsonify({"message": "서버 오류로 이름 삭제 실패", "details": str(e)}), 500
 
-@app.route('/api/give_ticket/<int:person_id>', methods=['POST'])
+@bp.route('/api/give_ticket/<int:person_id>', methods=['POST'])
 @login_required
 def give_ticket_api(person_id):
     if not current_user.is_admin:
         return jsonify({"message": "관리자만 룰렛권을 부여할 수 있습니다."}), 403
 
     try:
-        person = Person.query.get(person_id)
+        person = update_balance(person_id, give_ticket_change)
         if not person:
             return jsonify({"message": "해당 ID의 이름을 찾을 수 없습니다."}), 404
         
-        person.tickets += 1 
-        db.session.commit()
+        record_usage('tickets_granted')
         print(f"Gave 1 ticket to {person.name}. Total tickets: {person.tickets}")
-        return jsonify({"message": "룰렛권이 성공적으로 부여되었습니다.", "tickets": person.tickets}), 200
+        return jsonify({"message": "룰렛권이 성공적으로 부여되었습니다.", "tickets": person.tickets, "person": person.to_dict()}), 200
+    except BalanceRejected as e:
+        return jsonify({"message": str(e)}), 400
+    except BalanceConflict:
+        return jsonify({"message": "다른 요청과 동시에 처리되어 실패했습니다. 다시 시도해주세요."}), 409
     except Exception as e:
         db.session.rollback()
         print(f"Error giving ticket to person (ID: {person_id}): {e}")
         return jsonify({"message": "서버 오류로 룰렛권 부여 실패", "details": str(e)}), 500
 
 # ✨✨ 새로운 룰렛권 삭제 API! ✨✨
-@app.route('/api/remove_ticket/<int:person_id>', methods=['POST'])
+@bp.route('/api/remove_ticket/<int:person_id>', methods=['POST'])
 @login_required
 def remove_ticket_api(person_id):
     if not current_user.is_admin:
         return jsonify({"message": "관리자만 룰렛권을 삭제할 수 있습니다."}), 403
 
     try:
-        person = Person.query.get(person_id)
+        person = update_balance(person_id, remove_ticket_change)
         if not person:
             return jsonify({"message": "해당 ID의 이름을 찾을 수 없습니다."}), 404
         
-        if person.tickets <= 0:
-            return jsonify({"message": "룰렛권이 이미 0개입니다."}), 400
-
-        person.tickets -= 1 
-        db.session.commit()
         print(f"Removed 1 ticket from {person.name}. Total tickets: {person.tickets}")
-        return jsonify({"message": "룰렛권이 성공적으로 삭제되었습니다.", "tickets": person.tickets}), 200
+        return jsonify({"message": "룰렛권이 성공적으로 삭제되었습니다.", "tickets": person.tickets, "person": person.to_dict()}), 200
+    except BalanceRejected as e:
+        return jsonify({"message": str(e)}), 400
+    except BalanceConflict:
+        return jsonify({"message": "다른 요청과 동시에 처리되어 실패했습니다. 다시 시도해주세요."}), 409
     except Exception as e:
         db.session.rollback()
         print(f"Error removing ticket from person (ID: {person_id}): {e}")
         return jsonify({"message": "서버 오류로 룰렛권 삭제 실패", "details": str(e)}), 500
 
-@app.route('/api/give_star/<int:person_id>', methods=['POST'])
+@bp.route('/api/give_star/<int:person_id>', methods=['POST'])
 @login_required
 def give_star_api(person_id):
     if not current_user.is_admin:
         return jsonify({"message": "관리자만 별점을 부여할 수 있습니다."}), 403
 
     try:
-        person = Person.query.get(person_id)
+        person = update_balance(person_id, give_star_change)
         if not person:
             return jsonify({"message": "해당 ID의 이름을 찾을 수 없습니다."}), 404
         
-        person.stars += 1
-        db.session.commit()
-        check_and_reset_stars(person)
-        
+        record_usage('stars_granted')
+        if person.stars == 0:
+            record_usage('tickets_granted')  # 별점이 모여 룰렛권으로 바뀌었다
         print(f"Gave 1 star to {person.name}. Total stars: {person.stars}")
-        return jsonify({"message": "별점이 성공적으로 부여되었습니다.", "stars": person.stars}), 200
+        return jsonify({"message": "별점이 성공적으로 부여되었습니다.", "stars": person.stars, "person": person.to_dict()}), 200
+    except BalanceRejected as e:
+        return jsonify({"message": str(e)}), 400
+    except BalanceConflict:
+        return jsonify({"message": "다른 요청과 동시에 처리되어 실패했습니다. 다시 시도해주세요."}), 409
     except Exception as e:
         db.session.rollback()
         print(f"Error giving star to person (ID: {person_id}): {e}")
         return jsonify({"message": "서버 오류로 별점 부여 실패", "details": str(e)}), 500
 
 # ✨✨ 새로운 별점 삭제 API! ✨✨
-@app.route('/api/remove_star/<int:person_id>', methods=['POST'])
+@bp.route('/api/remove_star/<int:person_id>', methods=['POST'])
 @login_required
 def remove_star_api(person_id):
     if not current_user.is_admin:
         return jsonify({"message": "관리자만 별점을 삭제할 수 있습니다."}), 403
 
     try:
-        person = Person.query.get(person_id)
+        person = update_balance(person_id, remove_star_change)
         if not person:
             return jsonify({"message": "해당 ID의 이름을 찾을 수 없습니다."}), 404
         
-        if person.stars <= 0:
-            return jsonify({"message": "별점이 이미 0개입니다."}), 400
-
-        person.stars -= 1
-        db.session.commit()
         print(f"Removed 1 star from {person.name}. Total stars: {person.stars}")
-        return jsonify({"message": "별점이 성공적으로 삭제되었습니다.", "stars": person.stars}), 200
+        return jsonify({"message": "별점이 성공적으로 삭제되었습니다.", "stars": person.stars, "person": person.to_dict()}), 200
+    except BalanceRejected as e:
+        return jsonify({"message": str(e)}), 400
+    except BalanceConflict:
+        return jsonify({"message": "다른 요청과 동시에 처리되어 실패했습니다. 다시 시도해주세요."}), 409
     except Exception as e:
         db.session.rollback()
         print(f"Error removing star from person (ID: {person_id}): {e}")
         return jsonify({"message": "서버 오류로 별점 삭제 실패", "details": str(e)}), 500
 
-@app.route('/api/get_people', methods=['GET'])
+@bp.route('/api/get_people', methods=['GET'])
 @login_required 
 def get_people_api():
     try:
-        people = Person.query.all() 
-        people_data = [{
-            'id': p.id,
-            'name': p.name,
-            'tickets': p.tickets,
-            'is_admin': p.is_admin,
-            'stars': p.stars
-        } for p in people]
-        return jsonify({"people": people_data}), 200
+        # 같은 반 사람만 보낸다 (반이 없는 사람은 반이 없는 사람끼리)
+        return jsonify({"people": get_people_snapshot(current_user.room_id)}), 200
     except Exception as e:
         print(f"Error getting people data: {e}")
         return jsonify({"message": "서버 오류로 이름 목록 가져오기 실패", "details": str(e)}), 500
 
-@app.route('/api/spin_roulette', methods=['POST'])
+# 관리자 페이지의 가상 스크롤 테이블용: 검색/정렬/페이지 나누기를 모두 서버에서 처리
+ADMIN_PEOPLE_SORT_COLUMNS = {
+    'id': Person.id,
+    'name': Person.name,
+    'is_admin': Person.is_admin,
+    'tickets': Person.tickets,
+    'stars': Person.stars,
+    'room_id': Person.room_id,
+}
+ADMIN_PEOPLE_MAX_LIMIT = 200
+
+@bp.route('/api/admin/people', methods=['GET'])
+@login_required
+def admin_people_api():
+    if not current_user.is_admin:
+        return jsonify({"message": "관리자만 사용자 목록을 조회할 수 있습니다."}), 403
+
+    search = request.args.get('q', '').strip()
+    sort = request.args.get('sort', 'id')
+    order = request.args.get('order', 'asc')
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', 100, type=int)
+    room = request.args.get('room', '')  # '' 전체, 'none' 반 없음, 숫자면 그 반
+
+    if sort not in ADMIN_PEOPLE_SORT_COLUMNS or order not in ('asc', 'desc'):
+        return jsonify({"message": "지원하지 않는 정렬 방식입니다."}), 400
+    if room not in ('', 'none') and not room.isdigit():
+        return jsonify({"message": "room 은 반 ID 또는 none 이어야 합니다."}), 400
+    offset = max(offset, 0)
+    limit = min(max(limit, 1), ADMIN_PEOPLE_MAX_LIMIT)
+
+    try:
+        query = Person.query
+        if room == 'none':
+            query = query.filter(Person.room_id.is_(None))
+        elif room:
+            query = query.filter(Person.room_id == int(room))
+        if search:
+            escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            query = query.filter(Person.name.ilike(f'%{escaped}%', escape='\\'))
+        total = query.count()
+
+        sort_column = ADMIN_PEOPLE_SORT_COLUMNS[sort]
+        sort_column = sort_column.desc() if order == 'desc' else sort_column.asc()
+        # 같은 값이 여러 개일 때도 페이지 경계가 흔들리지 않도록 id 로 한 번 더 정렬
+        tiebreak = Person.id.desc() if order == 'desc' else Person.id.asc()
+        people = query.order_by(sort_column, tiebreak).offset(offset).limit(limit).all()
+
+        return jsonify({
+            "people": [p.to_dict() for p in people],
+            "total": total,
+            "offset": offset
+        }), 200
+    except Exception as e:
+        print(f"Error getting admin people page: {e}")
+        return jsonify({"message": "서버 오류로 사용자 목록 가져오기 실패", "details": str(e)}), 500
+
+@bp.route('/api/spin_roulette', methods=['POST'])
 @login_required 
 def spin_roulette():
     data = request.get_json()
@@ -907,64 +2021,1423 @@ def spin_roulette():
     if current_user.name != user_name:
         return jsonify({'message': '본인의 룰렛만 돌릴 수 있습니다.'}), 403
 
-    person = Person.query.filter_by(name=user_name).first()
+    outcome = {}
+
+    def settle_spin(person):
+        # 룰렛권 차감과 같은 트랜잭션에서 당첨을 정하고 재고 차감/스핀 기록까지 남긴다.
+        # 당첨 여부는 반의 당첨률로 서버가 정한다. 반에 상품 재고가 정해져 있으면 재고를 하나 가져와야 당첨이다.
+        win = random.random() < person.win_rate
+        sold_out = False
+        if win and person.room is not None and person.room.prize_stock is not None:
+            win = db.session.execute(claim_prize_statement(person.room_id)).rowcount == 1
+            sold_out = not win
+        # 커밋하면 객체가 만료되므로 응답에 쓸 값은 미리 꺼내 둔다
+        outcome.update(win=win, sold_out=sold_out, spin=record_spin(person, win).to_dict())
+
+    try:
+        person = update_balance(current_user.id, spin_ticket_change, before_commit=settle_spin)
+    except BalanceRejected as e:
+        return jsonify({'message': str(e)}), 400
+    except BalanceConflict:
+        return jsonify({'message': '다른 요청과 동시에 처리되어 실패했습니다. 다시 시도해주세요.'}), 409
+    except Exception as e:
+        print(f"Error spinning roulette for {user_name}: {e}")
+        return jsonify({'message': '서버 오류로 룰렛 돌리기 실패', 'details': str(e)}), 500
 
     if not person:
         return jsonify({'message': '해당 사용자를 찾을 수 없습니다.'}), 404
 
-    if person.tickets <= 0:
-        return jsonify({'message': f'{user_name}님은 룰렛권이 없습니다.'}), 400
+    record_usage('spins', person.id)
+    return jsonify({
+        'message': f'{user_name}님의 룰렛권이 1개 차감되었습니다.',
+        'remaining_tickets': person.tickets,
+        'win': outcome['win'],
+        'sold_out': outcome['sold_out'],
+        'spin': outcome['spin']
+    }), 200
+
+
+# --- 6. 룰렛권 캠페인 (예약 일괄 지급) ---
+# 관리자가 "월요일 09:00 에 관리자가 아닌 모든 사용자에게 2개" 같은 캠페인을 만들어 두면
+# 백그라운드 러너가 사람마다 클릭하는 대신 필터가 걸린 UPDATE 한 문장을 id 구간별로 나눠 실행한다.
+# 여러 워커/프로세스가 동시에 러너를 돌려도 조건부 UPDATE 로 실행 권한을 먼저 가져간 쪽만 실행한다.
+# 실행 권한은 claim_token 으로 구분하고, 구간마다 "내 토큰이고 진행 위치가 내가 읽은 그대로일 때만"
+# 진행 기록을 옮기는 조건부 UPDATE 를 지급과 같은 트랜잭션에서 실행한다. 멈춰 있던 러너가 깨어나도
+# 그 사이 다른 러너가 실행을 가져갔으면 이 UPDATE 가 0행이 되어 지급까지 롤백되므로 같은 구간을 두 번 주지 않는다.
+
+CAMPAIGN_TARGETS = {
+    'all': true(),
+    'non_admin': Person.is_admin.is_(False),
+    'zero_tickets': and_(Person.is_admin.is_(False), Person.tickets == 0),
+}
+CAMPAIGN_CHUNK_SIZE = 1000        # UPDATE 한 번에 다루는 id 구간 크기
+CAMPAIGN_POLL_SECONDS = 30        # 러너가 실행할 캠페인을 확인하는 주기
+CAMPAIGN_STALE_SECONDS = 300      # 이 시간 동안 진행 기록이 없으면 멈춘 실행으로 보고 이어서 실행
+
+class TicketCampaign(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False)
+    target = db.Column(db.String(20), nullable=False)
+    amount = db.Column(db.Integer, nullable=False)
+    weekday = db.Column(db.Integer, nullable=True)   # 0=월 ... 6=일, None 이면 한 번만 실행
+    run_time = db.Column(db.Time, nullable=True)
+    next_run_at = db.Column(db.DateTime, nullable=True, index=True)
+    is_active = db.Column(db.Boolean, default=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+
+    def to_dict(self):
+        last_run = CampaignRun.query.filter_by(campaign_id=self.id).order_by(CampaignRun.id.desc()).first()
+        return {
+            'id': self.id,
+            'name': self.name,
+            'target': self.target,
+            'amount': self.amount,
+            'weekday': self.weekday,
+            'run_time': self.run_time.strftime('%H:%M') if self.run_time else None,
+            'next_run_at': self.next_run_at.isoformat() if self.next_run_at else None,
+            'is_active': self.is_active,
+            'last_run': last_run.to_dict() if last_run else None
+        }
+
+class CampaignRun(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    campaign_id = db.Column(db.Integer, db.ForeignKey('ticket_campaign.id'), nullable=False, index=True)
+    status = db.Column(db.String(20), default='pending', nullable=False, index=True)  # pending/running/done/failed
+    claim_token = db.Column(db.String(32), nullable=True)  # 지금 이 실행을 맡은 러너
+    total_rows = db.Column(db.Integer, default=0, nullable=False)
+    processed_rows = db.Column(db.Integer, default=0, nullable=False)
+    last_person_id = db.Column(db.Integer, default=0, nullable=False)  # 여기까지의 id 구간은 지급 완료
+    max_person_id = db.Column(db.Integer, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        if self.status == 'done':
+            progress = 1.0
+        elif self.max_person_id:
+            progress = min(self.last_person_id / self.max_person_id, 1.0)
+        else:
+            progress = 0.0
+        return {
+            'id': self.id,
+            'campaign_id': self.campaign_id,
+            'status': self.status,
+            'total_rows': self.total_rows,
+            'processed_rows': self.processed_rows,
+            'progress': round(progress, 4),
+            'error': self.error,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+def next_campaign_run(weekday, run_time, after):
+    """after 이후에 처음 돌아오는 (요일, 시각)."""
+    candidate = datetime.combine(after.date(), run_time)
+    candidate += timedelta(days=(weekday - candidate.weekday()) % 7)
+    if candidate <= after:
+        candidate += timedelta(days=7)
+    return candidate
+
+def schedule_due_campaigns():
+    """실행 시각이 된 캠페인마다 대기 중인 실행(CampaignRun)을 하나씩 만든다."""
+    now = datetime.now()
+    due = TicketCampaign.query.filter(TicketCampaign.is_active.is_(True),
+                                      TicketCampaign.next_run_at <= now).all()
+    for campaign in due:
+        if campaign.weekday is not None:
+            next_run_at = next_campaign_run(campaign.weekday, campaign.run_time, now)
+        else:
+            next_run_at = None
+        # next_run_at 이 그대로인 경우에만 바꾼다 -> 여러 러너 중 한 곳만 실행을 만든다
+        claimed = db.session.execute(
+            update(TicketCampaign)
+            .where(TicketCampaign.id == campaign.id, TicketCampaign.next_run_at == campaign.next_run_at)
+            .values(next_run_at=next_run_at)
+        ).rowcount
+        if claimed == 1:
+            db.session.add(CampaignRun(campaign_id=campaign.id))
+        db.session.commit()
 
-    person.tickets -= 1
+def claim_campaign_run():
+    """대기 중이거나 멈춘 실행 하나를 이 러너 몫으로 가져온다. 없으면 None."""
+    now = datetime.now()
+    stale_before = now - timedelta(seconds=CAMPAIGN_STALE_SECONDS)
+    candidates = CampaignRun.query.filter(
+        or_(CampaignRun.status == 'pending',
+            and_(CampaignRun.status == 'running', CampaignRun.heartbeat_at < stale_before))
+    ).order_by(CampaignRun.id).limit(5).all()
+
+    for run in candidates:
+        claimed = db.session.execute(
+            update(CampaignRun)
+            .where(CampaignRun.id == run.id, CampaignRun.status == run.status,
+                   or_(CampaignRun.heartbeat_at.is_(None), CampaignRun.heartbeat_at == run.heartbeat_at))
+            .values(status='running', heartbeat_at=now, started_at=func.coalesce(CampaignRun.started_at, now),
+                    claim_token=uuid.uuid4().hex)
+        ).rowcount
+        db.session.commit()
+        if claimed == 1:
+            db.session.refresh(run)
+            return run
+    return None
+
+def _finish_campaign_run(run_id, token, status, error=None):
+    """아직 이 러너(token)가 맡고 있을 때만 실행을 끝낸다. 다른 러너가 가져갔으면 False."""
+    finished = db.session.execute(
+        update(CampaignRun)
+        .where(CampaignRun.id == run_id, CampaignRun.claim_token == token)
+        .values(status=status, error=error, finished_at=datetime.now())
+        .execution_options(synchronize_session=False)
+    ).rowcount
     db.session.commit()
+    return finished == 1
+
+def execute_campaign_run(run):
+    """
+    캠페인 한 번을 id 구간별 UPDATE 로 실행한다.
+
+    구간마다 커밋하므로 긴 잠금을 잡지 않고, last_person_id 에 진행 상황이 남아서
+    프로세스가 죽거나 실패해도 그 다음 구간부터 이어서 실행할 수 있다.
+    진행 기록은 claim_token 과 읽은 last_person_id 로 막아 두어, 실행을 빼앗긴 러너는 지급 없이 멈춘다.
+    """
+    token = run.claim_token
+    campaign = TicketCampaign.query.get(run.campaign_id)
+    condition = CAMPAIGN_TARGETS.get(campaign.target) if campaign else None
+    if condition is None:
+        _finish_campaign_run(run.id, token, 'failed', '캠페인이 삭제되었거나 대상 조건이 올바르지 않습니다.')
+        return
 
+    try:
+        if run.max_person_id is None:
+            # 실행을 시작한 시점까지 가입한 사람만 대상으로 한다
+            max_person_id = db.session.query(func.max(Person.id)).scalar() or 0
+            total_rows = Person.query.filter(condition, Person.id <= max_person_id).count()
+            db.session.execute(
+                update(CampaignRun)
+                .where(CampaignRun.id == run.id, CampaignRun.claim_token == token,
+                       CampaignRun.max_person_id.is_(None))
+                .values(max_person_id=max_person_id, total_rows=total_rows)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            db.session.refresh(run)
+            if run.claim_token != token:
+                return
+
+        low, max_person_id = run.last_person_id, run.max_person_id
+        while low < max_person_id:
+            high = min(low + CAMPAIGN_CHUNK_SIZE, max_person_id)
+            updated = db.session.execute(
+                update(Person)
+                .where(Person.id > low, Person.id <= high, condition)
+                .values(tickets=Person.tickets + campaign.amount, version=Person.version + 1)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            advanced = db.session.execute(
+                update(CampaignRun)
+                .where(CampaignRun.id == run.id, CampaignRun.claim_token == token,
+                       CampaignRun.last_person_id == low)
+                .values(last_person_id=high, processed_rows=CampaignRun.processed_rows + updated,
+                        heartbeat_at=datetime.now())
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if advanced != 1:
+                # 멈춰 있는 동안 다른 러너가 이 실행을 가져갔다 -> 이 구간 지급은 버리고 손을 뗀다
+                db.session.rollback()
+                print(f"Campaign run {run.id} was taken over by another runner; stopping at person id {low}.")
+                return
+            if updated:
+                change_bus.publish('people')
+            db.session.commit()
+            record_usage('tickets_granted', amount=updated * campaign.amount)
+            low = high
+
+        if _finish_campaign_run(run.id, token, 'done'):
+            db.session.refresh(run)
+            print(f"Campaign '{campaign.name}' (run {run.id}) gave {campaign.amount} ticket(s) to {run.processed_rows} people.")
+    except Exception as e:
+        db.session.rollback()
+        # 실패한 실행은 last_person_id 를 그대로 두므로 '지금 실행' 으로 그 지점부터 이어서 실행할 수 있다
+        _finish_campaign_run(run.id, token, 'failed', str(e))
+        print(f"Error executing campaign run {run.id}: {e}")
+
+def run_campaigns_once():
+    schedule_due_campaigns()
+    while True:
+        run = claim_campaign_run()
+        if run is None:
+            break
+        execute_campaign_run(run)
+
+def campaign_runner_loop(app, stop_event=None):
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        with app.app_context():
+            try:
+                run_campaigns_once()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error in campaign runner: {e}")
+            finally:
+                db.session.remove()
+        stop_event.wait(CAMPAIGN_POLL_SECONDS)
+
+_campaign_runner_started = False
+_campaign_runner_lock = threading.Lock()
+
+@bp.before_app_request
+def start_campaign_runner():
+    # 웹 요청을 막지 않도록 워커 프로세스마다 데몬 스레드 하나로 돌린다.
+    # 별도 프로세스로 돌리고 싶으면 CAMPAIGN_RUNNER=off 로 끄고 `flask --app wsgi run-campaigns` 를 실행한다.
+    global _campaign_runner_started
+    if _campaign_runner_started or os.environ.get('CAMPAIGN_RUNNER', 'thread') != 'thread':
+        return
+    with _campaign_runner_lock:
+        if not _campaign_runner_started:
+            # 요청을 처음 받은 워커 안에서 시작하므로 fork 이전의 master 에는 스레드가 생기지 않는다
+            threading.Thread(target=campaign_runner_loop, args=(current_app._get_current_object(),),
+                             name='campaign-runner', daemon=True).start()
+            _campaign_runner_started = True
+
+@bp.cli.command('run-campaigns')
+def run_campaigns_command():
+    """예약된 룰렛권 캠페인을 실행하는 러너를 이 프로세스에서 계속 돌린다."""
+    print("Campaign runner started.")
+    campaign_runner_loop(current_app._get_current_object())
+
+@bp.route('/api/campaigns', methods=['GET'])
+@login_required
+def list_campaigns_api():
+    if not current_user.is_admin:
+        return jsonify({"message": "관리자만 캠페인을 조회할 수 있습니다."}), 403
+    campaigns = TicketCampaign.query.order_by(TicketCampaign.id.desc()).all()
+    return jsonify({"campaigns": [c.to_dict() for c in campaigns]}), 200
+
+@bp.route('/api/campaigns', methods=['POST'])
+@login_required
+def create_campaign_api():
+    if not current_user.is_admin:
+        return jsonify({"message": "관리자만 캠페인을 만들 수 있습니다."}), 403
+
+    data = request.get_json() or {}
+    name = (data.get('name') or '').strip()
+    target = data.get('target')
+    amount = data.get('amount')
+    weekday = data.get('weekday')
+    run_time = data.get('run_time')
+
+    if not name:
+        return jsonify({"message": "캠페인 이름을 입력해주세요."}), 400
+    if target not in CAMPAIGN_TARGETS:
+        return jsonify({"message": "지원하지 않는 대상입니다.", "targets": list(CAMPAIGN_TARGETS)}), 400
+    if not isinstance(amount, int) or isinstance(amount, bool) or amount < 1:
+        return jsonify({"message": "지급할 룰렛권 수는 1 이상의 정수여야 합니다."}), 400
+
+    if weekday is not None:
+        if not isinstance(weekday, int) or not 0 <= weekday <= 6:
+            return jsonify({"message": "요일은 0(월)부터 6(일)까지입니다."}), 400
+        try:
+            run_time = datetime.strptime(run_time or '', '%H:%M').time()
+        except ValueError:
+            return jsonify({"message": "실행 시각은 HH:MM 형식이어야 합니다."}), 400
+        next_run_at = next_campaign_run(weekday, run_time, datetime.now())
+    else:
+        # 요일이 없으면 바로 한 번만 실행
+        run_time = None
+        next_run_at = datetime.now()
+
+    try:
+        campaign = TicketCampaign(name=name, target=target, amount=amount, weekday=weekday,
+                                  run_time=run_time, next_run_at=next_run_at)
+        db.session.add(campaign)
+        db.session.commit()
+        print(f"Created ticket campaign '{name}' (target: {target}, amount: {amount})")
+        return jsonify({"message": "캠페인이 등록되었습니다.", "campaign": campaign.to_dict()}), 201
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error creating campaign: {e}")
+        return jsonify({"message": "서버 오류로 캠페인 등록 실패", "details": str(e)}), 500
+
+@bp.route('/api/campaigns/<int:campaign_id>/run', methods=['POST'])
+@login_required
+def run_campaign_now_api(campaign_id):
+    if not current_user.is_admin:
+        return jsonify({"message": "관리자만 캠페인을 실행할 수 있습니다."}), 403
+
+    campaign = TicketCampaign.query.get(campaign_id)
+    if not campaign:
+        return jsonify({"message": "해당 ID의 캠페인을 찾을 수 없습니다."}), 404
+    try:
+        # 마지막 실행이 실패했으면 새로 처음부터 주지 않고 멈춘 지점(last_person_id)부터 이어서 실행한다
+        last_run = CampaignRun.query.filter_by(campaign_id=campaign.id).order_by(CampaignRun.id.desc()).first()
+        if last_run is not None and last_run.status == 'failed':
+            resumed = db.session.execute(
+                update(CampaignRun)
+                .where(CampaignRun.id == last_run.id, CampaignRun.status == 'failed')
+                .values(status='pending', error=None, finished_at=None)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+            if resumed == 1:
+                db.session.refresh(last_run)
+                return jsonify({"message": "실패했던 캠페인 실행을 멈춘 지점부터 다시 예약했습니다.",
+                                "run": last_run.to_dict()}), 202
+
+        run = CampaignRun(campaign_id=campaign.id)
+        db.session.add(run)
+        db.session.commit()
+        # 실제 지급은 러너가 하므로 바로 응답한다
+        return jsonify({"message": "캠페인 실행이 예약되었습니다.", "run": run.to_dict()}), 202
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error queueing campaign run (ID: {campaign_id}): {e}")
+        return jsonify({"message": "서버 오류로 캠페인 실행 실패", "details": str(e)}), 500
+
+@bp.route('/api/campaigns/<int:campaign_id>', methods=['DELETE'])
+@login_required
+def delete_campaign_api(campaign_id):
+    if not current_user.is_admin:
+        return jsonify({"message": "관리자만 캠페인을 삭제할 수 있습니다."}), 403
+
+    campaign = TicketCampaign.query.get(campaign_id)
+    if not campaign:
+        return jsonify({"message": "해당 ID의 캠페인을 찾을 수 없습니다."}), 404
+    # 실행 기록은 남겨두고 앞으로의 예약만 끈다
+    campaign.is_active = False
+    campaign.next_run_at = None
+    db.session.commit()
+    return jsonify({"message": "캠페인이 중지되었습니다."}), 200
+
+@bp.route('/api/campaign_runs/<int:run_id>', methods=['GET'])
+@login_required
+def campaign_run_api(run_id):
+    if not current_user.is_admin:
+        return jsonify({"message": "관리자만 캠페인 진행 상황을 볼 수 있습니다."}), 403
+
+    run = CampaignRun.query.get(run_id)
+    if not run:
+        return jsonify({"message": "해당 ID의 실행 기록을 찾을 수 없습니다."}), 404
+    return jsonify({"run": run.to_dict()}), 200
+
+
+# --- 7. 사용자 내보내기 / 가져오기 ---
+# 내보내기는 서버 측 커서로 EXPORT_BATCH_SIZE 행씩 읽어서 바로 흘려보내므로 100만 명이어도 메모리가 일정하다.
+# 가져오기는 IMPORT_BATCH_SIZE 행씩 검증 -> 비밀번호 해시(프로세스 풀) -> 한 번에 적재(Postgres 는 COPY,
+# 그 외에는 executemany) 순서로 처리하고, 실패한 행은 행 번호와 이유를 모아서 돌려준다.
+EXPORT_COLUMNS = ['id', 'name', 'password_hash', 'tickets', 'is_admin', 'stars', 'last_star_reset_date', 'room_id']
+EXPORT_BATCH_SIZE = 1000
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_REPORTED_ERRORS = 1000
+IMPORT_COPY_COLUMNS = ['name', 'password_hash', 'tickets', 'is_admin', 'stars', 'last_star_reset_date', 'version',
+                       'room_id']
+# 비밀번호 해시용 프로세스 풀은 프로세스마다 하나만 두고 가져오기 요청끼리 나눠 쓴다
+IMPORT_HASH_WORKERS = int(os.environ.get('IMPORT_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+_hash_pool = None
+_hash_pool_pid = None
+_hash_pool_lock = threading.Lock()
+
+def _get_hash_pool():
+    """
+    처음 필요할 때 만들고, 프로세스가 끝날 때 닫는다.
+
+    fork 로 물려받은 풀(자식 프로세스는 부모 것)이나 자식 프로세스가 죽어 깨진 풀은 버리고 새로 만든다.
+    """
+    global _hash_pool, _hash_pool_pid
+    # 해시 계산은 CPU 를 오래 쓰므로 프로세스 풀에서. 워커 스레드가 있는 프로세스를 fork 하지 않도록 spawn 사용
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+
+    with _hash_pool_lock:
+        if _hash_pool is not None and _hash_pool_pid == os.getpid() and getattr(_hash_pool, '_broken', False):
+            _hash_pool.shutdown(wait=False, cancel_futures=True)
+            _hash_pool = None
+        if _hash_pool is None or _hash_pool_pid != os.getpid():
+            if _hash_pool_pid is None:  # fork 한 자식은 부모가 건 atexit 를 그대로 물려받는다
+                atexit.register(_shutdown_hash_pool)
+            _hash_pool = ProcessPoolExecutor(max_workers=IMPORT_HASH_WORKERS,
+                                             mp_context=multiprocessing.get_context('spawn'))
+            _hash_pool_pid = os.getpid()
+        return _hash_pool
+
+def _shutdown_hash_pool():
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is not None and _hash_pool_pid == os.getpid():
+            _hash_pool.shutdown(wait=True, cancel_futures=True)
+        _hash_pool = None
+
+def _export_batches():
+    query = select(*[getattr(Person, column) for column in EXPORT_COLUMNS]).order_by(Person.id)
+    # yield_per -> psycopg2 에서는 이름 있는 서버 측 커서, SQLite 에서는 커서를 조금씩 읽는다
+    result = db.session.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for rows in result.partitions():
+        yield rows
+
+def _export_value(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+def export_csv_chunks():
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in _export_batches():
+        for row in rows:
+            writer.writerow([_export_value(value) for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def export_ndjson_chunks():
+    for rows in _export_batches():
+        yield ''.join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False, default=_export_value) + '\n'
+            for row in rows
+        )
+
+@bp.route('/api/admin/export', methods=['GET'])
+@login_required
+def export_people_api():
+    if not current_user.is_admin:
+        return jsonify({"message": "관리자만 사용자 목록을 내보낼 수 있습니다."}), 403
+
+    export_format = request.args.get('format', 'csv')
+    if export_format == 'csv':
+        chunks, mimetype = export_csv_chunks(), 'text/csv'
+    elif export_format == 'ndjson':
+        chunks, mimetype = export_ndjson_chunks(), 'application/x-ndjson'
+    else:
+        return jsonify({"message": "format 은 csv 또는 ndjson 이어야 합니다."}), 400
+
+    filename = f"people-{datetime.now():%Y%m%d-%H%M%S}.{export_format}"
+    print(f"Exporting people as {export_format} for {current_user.name}")
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+def _read_import_rows(stream, import_format):
+    """(행 번호, dict) 를 하나씩 돌려준다. 파일 전체를 메모리에 올리지 않는다."""
+    text_stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if import_format == 'csv':
+        for row_number, row in enumerate(csv.DictReader(text_stream), start=2):  # 1행은 헤더
+            yield row_number, row
+    else:
+        for row_number, line in enumerate(text_stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield row_number, None
+                continue
+            yield row_number, row if isinstance(row, dict) else None
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    value = str(value or '').strip().lower()
+    if value in ('', '0', 'false', 'no', 'n'):
+        return False
+    if value in ('1', 'true', 'yes', 'y'):
+        return True
+    raise ValueError(f"참/거짓 값이 아닙니다: {value}")
+
+def _parse_count(value, field):
+    if value in (None, ''):
+        return 0
+    number = int(value)
+    if number < 0:
+        raise ValueError(f"{field} 는 0 이상이어야 합니다.")
+    return number
+
+def _parse_room_id(value):
+    if value in (None, ''):
+        return None
+    return int(value)
+
+def _validate_import_row(row):
+    """검증된 행(dict)을 돌려준다. 비밀번호 해시는 나중에 한꺼번에 만든다."""
+    if row is None:
+        raise ValueError("JSON 객체가 아닌 줄입니다.")
+    name = str(row.get('name') or '').strip()
+    if not name:
+        raise ValueError("이름이 비어 있습니다.")
+    if len(name) > 80:
+        raise ValueError("이름은 80자 이하여야 합니다.")
+
+    password = row.get('password')
+    password_hash = row.get('password_hash')
+    if password:
+        if len(str(password)) < 6:
+            raise ValueError("비밀번호는 최소 6자 이상이어야 합니다.")
+    elif not password_hash:
+        raise ValueError("password 또는 password_hash 중 하나가 필요합니다.")
+
+    reset_date = row.get('last_star_reset_date')
+    return {
+        'name': name,
+        'password': str(password) if password else None,
+        'password_hash': password_hash if not password else None,
+        'tickets': _parse_count(row.get('tickets'), 'tickets'),
+        'stars': _parse_count(row.get('stars'), 'stars'),
+        'is_admin': _parse_bool(row.get('is_admin')),
+        'last_star_reset_date': date.fromisoformat(reset_date) if reset_date else date.today(),
+        'version': 1,
+        'room_id': _parse_room_id(row.get('room_id')),
+    }
+
+def _copy_people(records):
+    """Postgres: COPY ... FROM STDIN 으로 한 번에 적재."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for record in records:
+        writer.writerow([_export_value(record[column]) for column in IMPORT_COPY_COLUMNS])
+    buffer.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY person ({', '.join(IMPORT_COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+def _load_people_batch(records, errors):
+    """한 묶음을 적재하고 성공한 행 수를 돌려준다. 묶음이 통째로 실패하면 한 행씩 다시 넣어 원인을 찾는다."""
+    rows = [{column: record[column] for column in IMPORT_COPY_COLUMNS} for record in records]
+    try:
+        if db.engine.dialect.name == 'postgresql':
+            _copy_people(records)
+        else:
+            db.session.execute(insert(Person), rows)
+        db.session.commit()
+        return len(records)
+    except Exception:
+        db.session.rollback()
+
+    loaded = 0
+    for record, row in zip(records, rows):
+        try:
+            db.session.execute(insert(Person), [row])
+            db.session.commit()
+            loaded += 1
+        except IntegrityError:
+            db.session.rollback()
+            errors.append({'row': record['row'], 'name': record['name'], 'message': "이미 존재하는 아이디(이름)입니다."})
+        except Exception as e:
+            db.session.rollback()
+            errors.append({'row': record['row'], 'name': record['name'], 'message': str(e)})
+    return loaded
+
+def _import_batch(batch, errors, hash_pool):
+    existing = {name for (name,) in db.session.query(Person.name)
+                .filter(Person.name.in_([record['name'] for record in batch]))}
+    room_ids = {record['room_id'] for record in batch if record['room_id'] is not None}
+    known_rooms = {room_id for (room_id,) in db.session.query(Room.id).filter(Room.id.in_(room_ids))} if room_ids else set()
+    records = []
+    for record in batch:
+        if record['name'] in existing:
+            errors.append({'row': record['row'], 'name': record['name'], 'message': "이미 존재하는 아이디(이름)입니다."})
+        elif record['room_id'] is not None and record['room_id'] not in known_rooms:
+            errors.append({'row': record['row'], 'name': record['name'], 'message': "해당 반을 찾을 수 없습니다."})
+        else:
+            records.append(record)
+
+    to_hash = [record for record in records if record['password'] is not None]
+    if to_hash:
+        hashes = hash_pool.map(generate_password_hash, [record['password'] for record in to_hash],
+                               chunksize=max(1, len(to_hash) // 16))
+        for record, password_hash in zip(to_hash, hashes):
+            record['password_hash'] = password_hash
+
+    return _load_people_batch(records, errors) if records else 0
+
+@bp.route('/api/admin/import', methods=['POST'])
+@login_required
+def import_people_api():
+    if not current_user.is_admin:
+        return jsonify({"message": "관리자만 사용자를 가져올 수 있습니다."}), 403
+
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({"message": "가져올 파일(file)을 올려주세요."}), 400
+    import_format = request.form.get('format') or ('ndjson' if upload.filename.endswith(('.ndjson', '.jsonl')) else 'csv')
+    if import_format not in ('csv', 'ndjson'):
+        return jsonify({"message": "format 은 csv 또는 ndjson 이어야 합니다."}), 400
+
+    errors = []
+    imported = 0
+    seen_names = set()
+    batch = []
+    hash_pool = _get_hash_pool()
+    try:
+        for row_number, row in _read_import_rows(upload.stream, import_format):
+            try:
+                record = _validate_import_row(row)
+            except (ValueError, TypeError) as e:
+                errors.append({'row': row_number, 'name': (row or {}).get('name'), 'message': str(e)})
+                continue
+            if record['name'] in seen_names:
+                errors.append({'row': row_number, 'name': record['name'], 'message': "파일 안에서 이름이 중복됩니다."})
+                continue
+            seen_names.add(record['name'])
+            record['row'] = row_number
+            batch.append(record)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                imported += _import_batch(batch, errors, hash_pool)
+                batch = []
+        if batch:
+            imported += _import_batch(batch, errors, hash_pool)
+    except (UnicodeDecodeError, csv.Error) as e:
+        db.session.rollback()
+        return jsonify({"message": "파일을 읽을 수 없습니다.", "details": str(e), "imported": imported}), 400
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error importing people: {e}")
+        return jsonify({"message": "서버 오류로 가져오기 실패", "details": str(e), "imported": imported}), 500
+
+    if imported:
+        change_bus.publish('people')
+        db.session.commit()
+    print(f"Imported {imported} people ({len(errors)} rows failed)")
     return jsonify({
-        'message': f'{user_name}님의 룰렛권이 1개 차감되었습니다.',
-        'remaining_tickets': person.tickets
+        "message": f"{imported}명을 가져왔습니다. 실패 {len(errors)}건.",
+        "imported": imported,
+        "failed": len(errors),
+        "errors": errors[:IMPORT_MAX_REPORTED_ERRORS],
+        "errors_truncated": len(errors) > IMPORT_MAX_REPORTED_ERRORS
     }), 200
 
 
-if __name__ == '__main__':
+# --- 8. 사용 통계 (시간/일 단위 집계) ---
+# 스핀 수, 지급된 룰렛권/별점 수, 로그인 수, 활동 사용자 수를 시간대별로 본다.
+# 원본 테이블을 매번 훑는 대신
+#   1) 요청 처리 중에는 워커 메모리의 (지표, 시간 버킷) 카운터만 올리고
+#   2) 백그라운드 스레드가 ANALYTICS_FLUSH_SECONDS 마다 모아서 hour/day 집계 테이블에 더한다 (upsert)
+# 조회 API 는 집계 테이블만 읽으므로 사용자가 늘어도 조회 비용은 버킷 수에만 비례한다.
+# 워커마다 따로 더하기만 하므로 워커/호스트가 여러 개여도 합계가 맞다.
+# 활동 사용자는 같은 사람을 두 번 세지 않도록 (버킷, 사용자) 를 따로 기록하고, 처음 들어간 행 수만 더한다.
+# 이 (버킷, 사용자) 행은 중복 확인에만 쓰므로, 더는 카운트가 들어올 일이 없는 지난 버킷의 행은
+# flush 할 때 ANALYTICS_ACTIVE_USER_RETENTION 보다 오래된 것부터 지운다. (집계 테이블의 합계는 그대로 남는다)
+
+ANALYTICS_METRICS = ['spins', 'tickets_granted', 'stars_granted', 'logins', 'active_users']
+ANALYTICS_GRANULARITIES = {'hour': timedelta(hours=1), 'day': timedelta(days=1)}
+ANALYTICS_DEFAULT_RANGE = {'hour': 24, 'day': 30}    # 기간을 안 주면 최근 몇 개 버킷을 보여줄지
+ANALYTICS_MAX_BUCKETS = {'hour': 24 * 31, 'day': 366}
+ANALYTICS_FLUSH_SECONDS = 60
+ANALYTICS_INSERT_CHUNK = 500
+ANALYTICS_ACTIVE_USER_RETENTION = {'hour': timedelta(days=2), 'day': timedelta(days=7)}
+
+class UsageRollup(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    granularity = db.Column(db.String(10), nullable=False)   # hour / day
+    metric = db.Column(db.String(30), nullable=False)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    count = db.Column(db.Integer, default=0, nullable=False)
+    __table_args__ = (db.UniqueConstraint('granularity', 'metric', 'bucket_start', name='uq_usage_rollup_bucket'),)
+
+class UsageActiveUser(db.Model):
+    granularity = db.Column(db.String(10), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    person_id = db.Column(db.Integer, primary_key=True)
+
+def bucket_start(moment, granularity):
+    if granularity == 'day':
+        return datetime.combine(moment.date(), datetime.min.time())
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+class UsageCounter:
+    """워커 프로세스 하나의 아직 DB 에 쓰지 않은 카운트. 요청 스레드들이 같이 쓰므로 잠금으로 보호한다."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}    # (metric, 시간 버킷) -> 증가량
+        self._active = {}    # 시간 버킷 -> {person_id}
+
+    def record(self, metric, person_id=None, amount=1):
+        hour = bucket_start(datetime.now(), 'hour')
+        with self._lock:
+            key = (metric, hour)
+            self._counts[key] = self._counts.get(key, 0) + amount
+            if person_id is not None:
+                self._active.setdefault(hour, set()).add(person_id)
+
+    def drain(self):
+        with self._lock:
+            counts, self._counts = self._counts, {}
+            active, self._active = self._active, {}
+        return counts, active
+
+    def restore(self, counts, active):
+        """DB 에 쓰다가 실패한 몫을 다음 flush 때 다시 쓰도록 되돌려 놓는다."""
+        with self._lock:
+            for key, amount in counts.items():
+                self._counts[key] = self._counts.get(key, 0) + amount
+            for hour, people in active.items():
+                self._active.setdefault(hour, set()).update(people)
+
+usage_counter = UsageCounter()
+
+def record_usage(metric, person_id=None, amount=1):
+    # 통계 때문에 원래 요청이 실패하면 안 되므로 메모리 카운터만 올린다
+    usage_counter.record(metric, person_id, amount)
+
+def _dialect_insert(model):
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert(model)
+
+def _add_to_rollups(totals):
+    """totals: {(granularity, metric, bucket_start): 증가량} 를 집계 테이블에 더한다."""
+    rows = [{'granularity': g, 'metric': m, 'bucket_start': b, 'count': n} for (g, m, b), n in totals.items() if n]
+    if not rows:
+        return
+    stmt = _dialect_insert(UsageRollup)
+    if stmt is not None:
+        for i in range(0, len(rows), ANALYTICS_INSERT_CHUNK):
+            chunk = stmt.values(rows[i:i + ANALYTICS_INSERT_CHUNK])
+            db.session.execute(chunk.on_conflict_do_update(
+                index_elements=['granularity', 'metric', 'bucket_start'],
+                set_={'count': UsageRollup.count + chunk.excluded['count']}
+            ))
+        return
+    # ON CONFLICT 가 없는 DB: 더해 보고 없으면 새로 넣는다
+    for row in rows:
+        updated = db.session.execute(
+            update(UsageRollup)
+            .where(UsageRollup.granularity == row['granularity'], UsageRollup.metric == row['metric'],
+                   UsageRollup.bucket_start == row['bucket_start'])
+            .values(count=UsageRollup.count + row['count'])
+        ).rowcount
+        if updated == 0:
+            db.session.execute(insert(UsageRollup).values(**row))
+
+def _insert_new_active_users(rows):
+    """(granularity, bucket_start, person_id) 중 처음 보는 것만 넣고, 새로 들어간 수를 버킷별로 돌려준다."""
+    added = {}
+    stmt = _dialect_insert(UsageActiveUser)
+    for i in range(0, len(rows), ANALYTICS_INSERT_CHUNK):
+        chunk = rows[i:i + ANALYTICS_INSERT_CHUNK]
+        if stmt is not None:
+            # 이미 있던 행은 건너뛰고, 실제로 들어간 행만 돌려받는다
+            inserted = db.session.execute(
+                stmt.values(chunk).on_conflict_do_nothing()
+                .returning(UsageActiveUser.granularity, UsageActiveUser.bucket_start)
+            ).all()
+        else:
+            existing = set(db.session.execute(
+                select(UsageActiveUser.granularity, UsageActiveUser.bucket_start, UsageActiveUser.person_id)
+                .where(or_(*(and_(UsageActiveUser.granularity == r['granularity'],
+                                  UsageActiveUser.bucket_start == r['bucket_start'],
+                                  UsageActiveUser.person_id == r['person_id']) for r in chunk)))
+            ).all())
+            new_rows = [r for r in chunk if (r['granularity'], r['bucket_start'], r['person_id']) not in existing]
+            if new_rows:
+                db.session.execute(insert(UsageActiveUser), new_rows)
+            inserted = [(r['granularity'], r['bucket_start']) for r in new_rows]
+        for granularity, start in inserted:
+            key = (granularity, 'active_users', start)
+            added[key] = added.get(key, 0) + 1
+    return added
+
+def flush_usage():
+    """이 워커의 카운터를 집계 테이블에 쓴다. 실패하면 카운트를 되돌려 두고 예외를 그대로 올린다."""
+    counts, active = usage_counter.drain()
+    if not counts and not active:
+        return
+    try:
+        totals = {}
+        for (metric, hour), amount in counts.items():
+            for granularity in ANALYTICS_GRANULARITIES:
+                key = (granularity, metric, bucket_start(hour, granularity))
+                totals[key] = totals.get(key, 0) + amount
+
+        active_rows = {(granularity, bucket_start(hour, granularity), person_id)
+                       for hour, people in active.items()
+                       for granularity in ANALYTICS_GRANULARITIES
+                       for person_id in people}
+        active_rows = [{'granularity': g, 'bucket_start': b, 'person_id': p} for g, b, p in sorted(active_rows)]
+        for key, amount in _insert_new_active_users(active_rows).items():
+            totals[key] = totals.get(key, 0) + amount
+
+        _add_to_rollups(totals)
+        _prune_active_users(datetime.now())
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        usage_counter.restore(counts, active)
+        raise
+
+def _prune_active_users(now):
+    for granularity, retention in ANALYTICS_ACTIVE_USER_RETENTION.items():
+        db.session.execute(
+            UsageActiveUser.__table__.delete()
+            .where(UsageActiveUser.granularity == granularity,
+                   UsageActiveUser.bucket_start < bucket_start(now - retention, granularity))
+        )
+
+def analytics_flusher_loop(app, stop_event=None):
+    stop_event = stop_event or threading.Event()
+    while not stop_event.wait(ANALYTICS_FLUSH_SECONDS):
+        _flush_usage_in_context(app)
+
+def _flush_usage_in_context(app):
+    with app.app_context():
+        try:
+            flush_usage()
+        except Exception as e:
+            print(f"Error flushing usage analytics: {e}")
+        finally:
+            db.session.remove()
+
+_analytics_flusher_started = False
+_analytics_flusher_lock = threading.Lock()
+
+@bp.before_app_request
+def start_analytics_flusher():
+    # 캠페인 러너처럼 요청을 처음 받은 워커에서 데몬 스레드 하나로 돌린다.
+    # 워커가 정상 종료될 때 남은 카운트도 쓰도록 atexit 에도 건다.
+    global _analytics_flusher_started
+    if _analytics_flusher_started:
+        return
+    with _analytics_flusher_lock:
+        if not _analytics_flusher_started:
+            app = current_app._get_current_object()
+            threading.Thread(target=analytics_flusher_loop, args=(app,),
+                             name='analytics-flusher', daemon=True).start()
+            atexit.register(_flush_usage_in_context, app)
+            _analytics_flusher_started = True
+
+@bp.cli.command('flush-analytics')
+def flush_analytics_command():
+    """이 프로세스에 쌓인 사용 통계를 바로 집계 테이블에 쓴다 (스크립트/테스트용)."""
+    flush_usage()
+    print("Usage analytics flushed.")
+
+def _parse_analytics_time(value, granularity):
+    if not value:
+        return None
+    try:
+        return bucket_start(datetime.fromisoformat(value), granularity)
+    except ValueError:
+        raise ValueError(f"시간 형식이 올바르지 않습니다: {value}")
+
+@bp.route('/api/analytics', methods=['GET'])
+@login_required
+def analytics_api():
+    if not current_user.is_admin:
+        return jsonify({"message": "관리자만 사용 통계를 볼 수 있습니다."}), 403
+
+    granularity = request.args.get('granularity', 'hour')
+    if granularity not in ANALYTICS_GRANULARITIES:
+        return jsonify({"message": "granularity 는 hour 또는 day 여야 합니다."}), 400
+    metrics = [m for m in request.args.get('metrics', ','.join(ANALYTICS_METRICS)).split(',') if m]
+    unknown = [m for m in metrics if m not in ANALYTICS_METRICS]
+    if unknown or not metrics:
+        return jsonify({"message": f"지원하지 않는 지표입니다: {', '.join(unknown)}"}), 400
+
+    step = ANALYTICS_GRANULARITIES[granularity]
+    try:
+        end = _parse_analytics_time(request.args.get('end'), granularity) or bucket_start(datetime.now(), granularity)
+        start = (_parse_analytics_time(request.args.get('start'), granularity)
+                 or end - step * (ANALYTICS_DEFAULT_RANGE[granularity] - 1))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    if start > end:
+        return jsonify({"message": "start 가 end 보다 늦습니다."}), 400
+    if (end - start) // step + 1 > ANALYTICS_MAX_BUCKETS[granularity]:
+        return jsonify({"message": f"한 번에 최대 {ANALYTICS_MAX_BUCKETS[granularity]}개 구간까지 조회할 수 있습니다."}), 400
+
+    try:
+        rows = db.session.query(UsageRollup.metric, UsageRollup.bucket_start, UsageRollup.count).filter(
+            UsageRollup.granularity == granularity,
+            UsageRollup.metric.in_(metrics),
+            UsageRollup.bucket_start >= start,
+            UsageRollup.bucket_start <= end
+        ).all()
+    except Exception as e:
+        print(f"Error reading usage analytics: {e}")
+        return jsonify({"message": "서버 오류로 사용 통계 조회 실패", "details": str(e)}), 500
+
+    counts = {(r.metric, r.bucket_start): r.count for r in rows}
+    buckets = []
+    moment = start
+    while moment <= end:
+        buckets.append(moment)
+        moment += step
+    # 기록이 없는 구간도 0 으로 채워서 그래프를 그대로 그릴 수 있게 한다
+    return jsonify({
+        "granularity": granularity,
+        "buckets": [b.isoformat() for b in buckets],
+        "series": {m: [counts.get((m, b), 0) for b in buckets] for m in metrics},
+        "totals": {m: sum(counts.get((m, b), 0) for b in buckets) for m in metrics}
+    }), 200
+
+
+# --- 9. 반(교실) ---
+# 반마다 사람 목록, 당첨률, 별점->룰렛권 기준, 상품 재고가 따로다.
+# 학생은 자기 반만 보고(/api/get_people, /api/rooms/<id>/people), 관리자는 모든 반을 만들고 사람을 옮긴다.
+# 목록은 반별 스냅샷에서 나가므로 한 반을 보여주는 비용은 그 반 인원에만 비례한다.
+# 실시간 갱신 스트림(/api/rooms/<id>/stream)은 연결을 오래 붙잡으므로 asgi.py 에서만 제공하고,
+# Flask 만 띄운 배포에서는 index.html 이 5초 폴링으로 돌아간다.
+
+def _parse_room_settings(data, partial=False):
+    """요청 JSON 에서 반 설정을 검증해 dict 로 돌려준다. 잘못되면 ValueError."""
+    settings = {}
+    if 'name' in data or not partial:
+        name = str(data.get('name') or '').strip()
+        if not name or len(name) > 80:
+            raise ValueError("반 이름은 1~80자여야 합니다.")
+        settings['name'] = name
+    if 'win_rate' in data:
+        win_rate = float(data['win_rate'])
+        if not 0.0 <= win_rate <= 1.0:
+            raise ValueError("당첨률은 0과 1 사이여야 합니다.")
+        settings['win_rate'] = win_rate
+    if 'stars_per_ticket' in data:
+        stars_per_ticket = int(data['stars_per_ticket'])
+        if stars_per_ticket < 1:
+            raise ValueError("룰렛권 1개에 필요한 별점은 1 이상이어야 합니다.")
+        settings['stars_per_ticket'] = stars_per_ticket
+    if 'prize_stock' in data:
+        prize_stock = data['prize_stock']
+        if prize_stock in (None, ''):
+            settings['prize_stock'] = None
+        else:
+            prize_stock = int(prize_stock)
+            if prize_stock < 0:
+                raise ValueError("상품 재고는 0 이상이어야 합니다.")
+            settings['prize_stock'] = prize_stock
+    return settings
+
+def _can_view_room(room_id):
+    return current_user.is_admin or current_user.room_id == room_id
+
+@bp.route('/api/rooms', methods=['GET'])
+@login_required
+def list_rooms_api():
+    if not current_user.is_admin:
+        room = current_user.room
+        return jsonify({"rooms": [room.to_dict()] if room else []}), 200
+
+    counts = dict(db.session.query(Person.room_id, func.count(Person.id))
+                  .filter(Person.room_id.isnot(None)).group_by(Person.room_id).all())
+    rooms = Room.query.order_by(Room.name).all()
+    return jsonify({"rooms": [room.to_dict(member_count=counts.get(room.id, 0)) for room in rooms]}), 200
+
+@bp.route('/api/rooms', methods=['POST'])
+@login_required
+def create_room_api():
+    if not current_user.is_admin:
+        return jsonify({"message": "관리자만 반을 만들 수 있습니다."}), 403
+
+    try:
+        settings = _parse_room_settings(request.get_json() or {})
+    except (TypeError, ValueError) as e:
+        return jsonify({"message": str(e)}), 400
+    if Room.query.filter_by(name=settings['name']).first():
+        return jsonify({"message": "이미 존재하는 반 이름입니다."}), 409
+
+    try:
+        room = Room(**settings)
+        db.session.add(room)
+        db.session.commit()
+        print(f"Created room '{room.name}' (ID: {room.id})")
+        return jsonify({"message": f"'{room.name}' 반이 만들어졌습니다.", "room": room.to_dict(member_count=0)}), 201
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"message": "이미 존재하는 반 이름입니다."}), 409
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error creating room: {e}")
+        return jsonify({"message": "서버 오류로 반 만들기 실패", "details": str(e)}), 500
+
+@bp.route('/api/rooms/<int:room_id>', methods=['PATCH'])
+@login_required
+def update_room_api(room_id):
+    if not current_user.is_admin:
+        return jsonify({"message": "관리자만 반 설정을 바꿀 수 있습니다."}), 403
+
+    room = db.session.get(Room, room_id)
+    if not room:
+        return jsonify({"message": "해당 반을 찾을 수 없습니다."}), 404
+    try:
+        settings = _parse_room_settings(request.get_json() or {}, partial=True)
+    except (TypeError, ValueError) as e:
+        return jsonify({"message": str(e)}), 400
+
+    try:
+        for key, value in settings.items():
+            setattr(room, key, value)
+        db.session.commit()
+        print(f"Updated room '{room.name}' (ID: {room.id}): {settings}")
+        return jsonify({"message": f"'{room.name}' 반 설정이 저장되었습니다.", "room": room.to_dict()}), 200
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"message": "이미 존재하는 반 이름입니다."}), 409
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error updating room (ID: {room_id}): {e}")
+        return jsonify({"message": "서버 오류로 반 설정 저장 실패", "details": str(e)}), 500
+
+@bp.route('/api/rooms/<int:room_id>', methods=['DELETE'])
+@login_required
+def delete_room_api(room_id):
+    if not current_user.is_admin:
+        return jsonify({"message": "관리자만 반을 삭제할 수 있습니다."}), 403
+
+    room = db.session.get(Room, room_id)
+    if not room:
+        return jsonify({"message": "해당 반을 찾을 수 없습니다."}), 404
+    try:
+        # 반에 있던 사람은 지우지 않고 '반 없음'으로 옮긴다
+        moved = db.session.execute(
+            update(Person).where(Person.room_id == room_id).values(room_id=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.delete(room)
+        change_bus.publish('people')
+        db.session.commit()
+        print(f"Deleted room '{room.name}' (ID: {room_id}), {moved} people unassigned")
+        return jsonify({"message": f"'{room.name}' 반이 삭제되었습니다.", "unassigned": moved}), 200
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error deleting room (ID: {room_id}): {e}")
+        return jsonify({"message": "서버 오류로 반 삭제 실패", "details": str(e)}), 500
+
+@bp.route('/api/rooms/members', methods=['POST'])
+@login_required
+def move_room_members_api():
+    """{"room_id": 반 ID 또는 null, "person_ids": [...]} -> 한 문장으로 여러 명을 옮긴다."""
+    if not current_user.is_admin:
+        return jsonify({"message": "관리자만 반을 바꿀 수 있습니다."}), 403
+
+    data = request.get_json() or {}
+    room_id = data.get('room_id')
+    person_ids = data.get('person_ids') or []
+    if not isinstance(person_ids, list) or not all(isinstance(i, int) for i in person_ids) or not person_ids:
+        return jsonify({"message": "person_ids 는 사람 ID 목록이어야 합니다."}), 400
+    if room_id is not None and not db.session.get(Room, room_id):
+        return jsonify({"message": "해당 반을 찾을 수 없습니다."}), 404
+
+    try:
+        moved = db.session.execute(
+            update(Person).where(Person.id.in_(person_ids)).values(room_id=room_id)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        # 옮기기 전/후 두 반과 사람->반 정보가 모두 바뀌므로 전체 무효화
+        change_bus.publish('people')
+        db.session.commit()
+        print(f"Moved {moved} people to room {room_id}")
+        return jsonify({"message": f"{moved}명의 반을 바꿨습니다.", "moved": moved}), 200
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error moving people to room {room_id}: {e}")
+        return jsonify({"message": "서버 오류로 반 이동 실패", "details": str(e)}), 500
+
+@bp.route('/api/rooms/<int:room_id>/people', methods=['GET'])
+@login_required
+def room_people_api(room_id):
+    if not _can_view_room(room_id):
+        return jsonify({"message": "자기 반만 볼 수 있습니다."}), 403
+    room = db.session.get(Room, room_id)
+    if not room:
+        return jsonify({"message": "해당 반을 찾을 수 없습니다."}), 404
+    try:
+        return jsonify({"room": room.to_dict(), "people": get_people_snapshot(room_id)}), 200
+    except Exception as e:
+        print(f"Error getting people of room {room_id}: {e}")
+        return jsonify({"message": "서버 오류로 반 목록 가져오기 실패", "details": str(e)}), 500
+
+
+# --- 10. 스핀 기록 ---
+# 룰렛을 돌릴 때마다 한 줄씩 남긴다. 전체 기록은 /api/spin_history 로 최신순 keyset 페이지네이션
+# (before_id 보다 작은 id 를 limit 개)으로 보여주므로 기록이 아무리 쌓여도 페이지마다 (person_id, id) 인덱스만 훑는다.
+# "내 최근 스핀" 은 사용자마다 최근 RECENT_SPINS_PER_USER 개를 메모리 링 버퍼에 두고,
+# change_bus 의 'spin' 이벤트로 채운다. 사람 목록 스냅샷과 같은 이유로, 이벤트가 다른 프로세스까지 가는 Postgres 면
+# 오래 캐시해서 DB 를 거의 다시 읽지 않고, SQLite 처럼 다른 워커의 스핀을 모를 수 있으면 짧게만 캐시한다.
+SPIN_HISTORY_MAX_LIMIT = 100
+RECENT_SPINS_PER_USER = 20
+RECENT_SPINS_TTL = PEOPLE_SNAPSHOT_TTL
+RECENT_SPINS_TTL_DISTRIBUTED = PEOPLE_SNAPSHOT_TTL_DISTRIBUTED
+RECENT_SPINS_MAX_USERS = int(os.environ.get('RECENT_SPINS_MAX_USERS', '10000'))
+
+class SpinHistory(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    person_id = db.Column(db.Integer, db.ForeignKey('person.id', ondelete='CASCADE'), nullable=False)
+    # 반이 삭제되거나 사람이 반을 옮겨도 돌렸을 때의 반을 남기도록 FK 를 걸지 않는다
+    room_id = db.Column(db.Integer, nullable=True)
+    win = db.Column(db.Boolean, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    __table_args__ = (db.Index('ix_spin_history_person_id_id', 'person_id', 'id'),)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'win': self.win,
+            'room_id': self.room_id,
+            'created_at': self.created_at.isoformat()
+        }
+
+def spin_change_fields(spin_id, person_id, room_id, win, created_at):
+    """'spin' 이벤트 필드. 받는 쪽은 spin_from_change 로 SpinHistory.to_dict() 와 같은 모양을 다시 만든다."""
+    return {'id': person_id, 'h': spin_id, 'r': room_id, 'w': win, 'at': created_at.isoformat()}
+
+def spin_from_change(change):
+    return {'id': change['h'], 'win': change['w'], 'room_id': change['r'], 'created_at': change['at']}
+
+def record_spin(person, win):
+    """지금 세션에 스핀 기록을 추가하고 커밋되면 전달될 'spin' 이벤트를 남긴다. 커밋은 호출한 쪽이 한다."""
+    spin = SpinHistory(person_id=person.id, room_id=person.room_id, win=win, created_at=datetime.now())
+    db.session.add(spin)
+    db.session.flush()
+    change_bus.publish('spin', **spin_change_fields(spin.id, person.id, spin.room_id, win, spin.created_at))
+    return spin
+
+class RecentSpins:
+    """
+    사용자별 최근 스핀 링 버퍼 (최신이 앞). 사용자 수는 max_users 로 제한하고 오래 안 본 사용자부터 버린다.
+
+    캐시에 없는 사용자의 'spin' 이벤트는 버린다 (처음 볼 때 DB 에서 통째로 읽으므로).
+    이벤트로 못 받는 변경(다른 프로세스의 스핀)이 있을 수 있으므로 각 버퍼는 읽은 뒤 TTL 이 지나면 버린다.
+    대신 DB 에서 읽는 중에 그 사용자의 이벤트가 오면 읽은 결과가 낡았을 수 있으므로 저장하지 않는다.
+    """
+
+    def __init__(self, per_user=RECENT_SPINS_PER_USER, max_users=RECENT_SPINS_MAX_USERS):
+        self.per_user = per_user
+        self.max_users = max_users
+        self._buffers = OrderedDict()  # person_id -> deque
+        self._expires_at = {}          # person_id -> 이 시각이 지나면 DB 에서 다시 읽는다
+        self._loading = {}             # person_id -> 읽기 시작할 때 받은 토큰
+        self._lock = threading.Lock()
+
+    def get(self, person_id):
+        with self._lock:
+            buffer = self._buffers.get(person_id)
+            if buffer is None:
+                return None
+            if time.monotonic() >= self._expires_at[person_id]:
+                del self._buffers[person_id]
+                del self._expires_at[person_id]
+                return None
+            self._buffers.move_to_end(person_id)
+            return list(buffer)
+
+    def begin_load(self, person_id):
+        token = object()
+        with self._lock:
+            self._loading[person_id] = token
+        return token
+
+    def store(self, person_id, spins, token):
+        ttl = RECENT_SPINS_TTL_DISTRIBUTED if change_bus.is_distributed else RECENT_SPINS_TTL
+        with self._lock:
+            if self._loading.get(person_id) is token:
+                del self._loading[person_id]
+                self._buffers[person_id] = deque(spins, maxlen=self.per_user)
+                self._buffers.move_to_end(person_id)
+                self._expires_at[person_id] = time.monotonic() + ttl
+                while len(self._buffers) > self.max_users:
+                    evicted, _ = self._buffers.popitem(last=False)
+                    del self._expires_at[evicted]
+        return spins
+
+    def add(self, person_id, spin):
+        with self._lock:
+            self._loading.pop(person_id, None)
+            buffer = self._buffers.get(person_id)
+            if buffer is None:
+                return
+            if buffer and buffer[0]['id'] >= spin['id']:
+                # 이벤트 순서가 뒤바뀌었거나 같은 이벤트가 두 번 왔다 -> id 순서대로 다시 맞춘다
+                if any(s['id'] == spin['id'] for s in buffer):
+                    return
+                spins = sorted([*buffer, spin], key=lambda s: s['id'], reverse=True)
+                self._buffers[person_id] = deque(spins[:self.per_user], maxlen=self.per_user)
+                return
+            buffer.appendleft(spin)
+
+    def forget(self, person_id):
+        with self._lock:
+            self._loading.pop(person_id, None)
+            self._buffers.pop(person_id, None)
+            self._expires_at.pop(person_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._loading.clear()
+            self._buffers.clear()
+            self._expires_at.clear()
+
+    def handle_change(self, change):
+        kind = change['k']
+        if kind == 'spin':
+            self.add(change['id'], spin_from_change(change))
+        elif kind == 'spins':
+            self.forget(change['id'])
+        elif kind == 'resync':
+            self.clear()
+
+recent_spins = RecentSpins()
+change_bus.subscribe(recent_spins.handle_change)
+
+def recent_spin_history_query(person_id, limit=RECENT_SPINS_PER_USER):
+    return select(SpinHistory).where(SpinHistory.person_id == person_id) \
+        .order_by(SpinHistory.id.desc()).limit(limit)
+
+def get_recent_spins(person_id):
+    spins = recent_spins.get(person_id)
+    if spins is None:
+        token = recent_spins.begin_load(person_id)
+        rows = db.session.execute(recent_spin_history_query(person_id)).scalars().all()
+        spins = recent_spins.store(person_id, [spin.to_dict() for spin in rows], token)
+    return spins
+
+@bp.route('/api/spin_history', methods=['GET'])
+@login_required
+def spin_history_api():
+    """내 스핀 기록 (최신순). 다음 페이지는 응답의 next_before_id 를 before_id 로 넘겨서 받는다."""
+    before_id = request.args.get('before_id', type=int)
+    limit = min(max(request.args.get('limit', 20, type=int), 1), SPIN_HISTORY_MAX_LIMIT)
+
+    try:
+        query = select(SpinHistory).where(SpinHistory.person_id == current_user.id)
+        if before_id is not None:
+            query = query.where(SpinHistory.id < before_id)
+        # 다음 페이지가 있는지 알기 위해 하나 더 읽는다
+        spins = db.session.execute(query.order_by(SpinHistory.id.desc()).limit(limit + 1)).scalars().all()
+        has_more = len(spins) > limit
+        spins = spins[:limit]
+        return jsonify({
+            "spins": [spin.to_dict() for spin in spins],
+            "next_before_id": spins[-1].id if has_more else None
+        }), 200
+    except Exception as e:
+        print(f"Error getting spin history for {current_user.name}: {e}")
+        return jsonify({"message": "서버 오류로 스핀 기록 가져오기 실패", "details": str(e)}), 500
+
+@bp.route('/api/spin_history/recent', methods=['GET'])
+@login_required
+def recent_spins_api():
+    try:
+        return jsonify({"spins": get_recent_spins(current_user.id)}), 200
+    except Exception as e:
+        print(f"Error getting recent spins for {current_user.name}: {e}")
+        return jsonify({"message": "서버 오류로 최근 스핀 가져오기 실패", "details": str(e)}), 500
+
+
+# --- 11. 앱 팩토리 / 초기화 ---
+BOOTSTRAP_LOCK_ID = 7_271_024  # Postgres advisory lock 번호 (여러 호스트가 동시에 초기화하지 않도록)
+
+_live_apps = weakref.WeakSet()  # create_app() 으로 만든 앱들 (fork 후 엔진 풀을 버릴 대상)
+
+def _dispose_engines_after_fork():
+    # 부모에게서 물려받은 커넥션을 자식이 같이 쓰면 안 되므로 풀만 버린다.
+    # close=False: 부모가 아직 쓰고 있을 수 있는 소켓은 닫지 않는다.
+    for app in list(_live_apps):
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+
+# 앱마다 걸면 create_app() 을 부를 때마다 훅이 쌓이므로 모듈을 불러올 때 한 번만 건다
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_dispose_engines_after_fork)
+
+def create_app(config=None):
+    """
+    Flask 앱을 만든다. DB 에는 접속하지 않으므로 gunicorn --preload 로 master 에서 한 번 불러도 빠르다.
+
+    스키마/관리자 계정 준비는 bootstrap(app) 이 따로 한다.
+    """
+    app = Flask(__name__)
+
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL') or 'sqlite:///site_data.db'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # 풀에서 꺼낸 커넥션이 끊겨 있으면 다시 연결 (재시작/장애 조치 후 첫 요청 실패 방지)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'pool_pre_ping': True}
+
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY') or 'your-super-duper-secret-key-please-change-me-12345'
+
+    if config:
+        app.config.update(config)
+
+    db.init_app(app)
+    CORS(app)
+    login_manager.init_app(app)
+    app.register_blueprint(bp)
+    # 과부하 때 낮은 우선순위 요청(폴링)부터 DB 에 닿기 전에 503 으로 돌려보낸다
+    admission.init_app(app, db)
+    # 잔액이 바뀌면 모든 워커의 캐시에 알린다 (Postgres LISTEN/NOTIFY, 아니면 프로세스 안에서만)
+    change_bus.init_app(app, db)
+    # 텍스트/JSON 응답 압축과 ETag (바뀌지 않은 폴링 응답은 304)
+    http_cache.init_app(app)
+
+    _live_apps.add(app)
+
+    return app
+
+def ensure_admin_user():
+    if Person.query.filter_by(name='admin').first():
+        print("Admin user 'admin' already exists. Skipping creation.")
+        return
+    try:
+        admin_user = Person(name='admin', is_admin=True)
+        admin_user.set_password(os.environ.get('ADMIN_PASSWORD', 'seoan1024'))
+        db.session.add(admin_user)
+        db.session.commit()
+        print("Initial admin user 'admin' created successfully.")
+    except IntegrityError:
+        # 다른 프로세스가 먼저 만들었다 -> 그대로 사용
+        db.session.rollback()
+        print("Admin user 'admin' was created by another process. Skipping creation.")
+
+def bootstrap(app):
+    """
+    테이블/컬럼 생성과 기본 관리자 계정 생성. 몇 번을 불러도 결과가 같다.
+
+    gunicorn 에서는 gunicorn.conf.py 의 on_starting 훅이 master 에서 한 번만 부른다.
+    Postgres 에서는 advisory lock 으로 여러 호스트가 동시에 실행해도 한 곳씩만 진행한다.
+    """
     with app.app_context():
         if os.environ.get('DATABASE_URL'):
             print("Using external database from DATABASE_URL environment variable.")
+        use_lock = db.engine.dialect.name == 'postgresql'
+        try:
+            if use_lock:
+                lock_connection = db.engine.connect()
+                lock_connection.execute(text("SELECT pg_advisory_lock(:id)"), {'id': BOOTSTRAP_LOCK_ID})
             try:
                 db.create_all()
-                print("External database tables initialized (if not already existing).")
-            except OperationalError as e:
-                print(f"Error initializing external database tables: {e}")
-                print("Please ensure your external database is properly configured and accessible.")
-            except Exception as e:
-                print(f"Unexpected error during external database table creation: {e}")
-        else:
-            if not os.path.exists('site_data.db'):
-                db.create_all()
-                print("Database 'site_data.db' created and tables initialized.")
-            else:
-                print("Database 'site_data.db' already exists. Skipping table creation.")
-        
-        try:
-            existing_admin = Person.query.filter_by(name='admin').first()
-            
-            if not existing_admin:
-                admin_user = Person(name='admin', is_admin=True)
-                admin_user.set_password('seoan1024')
-                db.session.add(admin_user)
-                db.session.commit()
-                print("Initial admin user 'admin' created successfully during first run.")
-            else:
-                print("Admin user 'admin' already exists. Skipping creation.")
-        except IntegrityError:
-            db.session.rollback()
-            print("Admin user 'admin' already exists due to IntegrityError (likely race condition). Skipping creation.")
+                upgrade_schema()
+                print("Database tables initialized (if not already existing).")
+                ensure_admin_user()
+            finally:
+                if use_lock:
+                    lock_connection.execute(text("SELECT pg_advisory_unlock(:id)"), {'id': BOOTSTRAP_LOCK_ID})
+                    lock_connection.close()
         except OperationalError as e:
             db.session.rollback()
-            print(f"OperationalError during admin user check/creation: {e}. This might occur if tables were not fully created or DB connection is unstable.")
+            print(f"OperationalError during database bootstrap: {e}")
             print("If you are on Railway, please ensure your database service is healthy and connected.")
         except Exception as e:
             db.session.rollback()
-            print(f"Unexpected error during admin user check/creation: {e}")
-
-    app.run(debug=False, port=5000)
+            print(f"Unexpected error during database bootstrap: {e}")
+        finally:
+            db.session.remove()
+            # master 가 초기화에 쓴 커넥션을 fork 전에 모두 닫는다
+            db.engine.dispose()
 
 
+if __name__ == '__main__':
+    app = create_app()
+    bootstrap(app)
+    app.run(debug=False, port=5000)
@@ -0,0 +1,564 @@
+# asgi.py
+# 룰렛 탭들이 가장 많이 부르는 API 를 async 로 처리하는 ASGI 진입점.
+#
+#   python asgi.py                          # bootstrap 후 uvicorn 으로 실행 (PORT, WEB_CONCURRENCY 사용)
+#   uvicorn asgi:build_app --factory --workers 2   # 스키마 준비가 끝난 DB 에 바로 붙일 때
+#
+# 모듈을 불러오기만 해서는 Flask 앱/DB 엔진을 만들지 않는다. uvicorn 이 다시 import 하거나
+# spawn 된 자식 프로세스(가져오기용 해시 풀)가 불러와도 앱이 또 생기지 않도록, 앱은 build_app() 에서만 만든다.
+#
+# gthread 워커에서는 5초마다 오는 /api/get_people 폴링과 스핀 요청 하나하나가 DB 응답을 기다리는 동안
+# 스레드를 하나씩 붙잡는다. 여기서는
+#   GET  /api/get_people
+#   POST /api/spin_roulette
+#   POST /api/login
+#   GET  /api/spin_history/recent  (링 버퍼에 있으면 DB 를 읽지 않는다)
+#   GET  /api/rooms/<id>/stream   (반 목록 실시간 갱신, Server-Sent Events)
+# 만 이벤트 루프 위에서 async DB 드라이버(asyncpg / aiosqlite)로 처리하고,
+# 나머지 경로(관리자 화면, 캠페인, 내보내기 ...)는 기존 Flask 앱을 WSGI 미들웨어로 감싸서 그대로 쓴다.
+#
+# 로그인 상태는 Flask 와 같은 세션 쿠키(SECRET_KEY 로 서명)를 읽고 쓰므로
+# 어느 쪽에서 로그인해도 다른 쪽에서 그대로 로그인되어 있다.
+# 잔액 변경은 app.py 와 같은 CAS 규칙/변경 알림(change_bus)/사용 통계를 그대로 따른다.
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from types import SimpleNamespace
+from urllib.parse import quote
+
+from a2wsgi import WSGIMiddleware
+from itsdangerous import BadSignature
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, RedirectResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+import admission
+import http_cache
+from app import (create_app, bootstrap, db, Person, Room, SpinHistory, BALANCE_UPDATE_RETRIES, ROULETTE_WIN_RATE,
+                 BalanceConflict, BalanceRejected, balance_change_fields, balance_retry_delay, cached_people_snapshot,
+                 cached_person_room, claim_prize_statement, people_snapshot_query, recent_spin_history_query,
+                 recent_spins, record_usage, spin_change_fields, spin_from_change, spin_ticket_change,
+                 start_analytics_flusher, start_campaign_runner, store_people_snapshot)
+from change_bus import change_bus
+
+ASYNC_DRIVERS = {'postgresql': 'postgresql+asyncpg', 'sqlite': 'sqlite+aiosqlite'}
+# 이벤트 루프 하나가 동시에 받는 요청 수. 스레드보다 훨씬 싸므로 gthread 의 스레드 수보다 크게 잡는다
+ASYNC_MAX_IN_FLIGHT = int(os.environ.get('ASYNC_MAX_IN_FLIGHT', '256'))
+# Flask 쪽으로 넘기는 나머지 경로를 처리할 스레드 수
+WSGI_THREADS = int(os.environ.get('GUNICORN_THREADS', '8'))
+STREAM_QUEUE_SIZE = 100          # 스트림 하나에 밀려 있을 수 있는 이벤트 수. 넘치면 목록을 통째로 다시 받게 한다
+STREAM_HEARTBEAT_SECONDS = 15    # 프록시가 연결을 끊지 않도록 보내는 빈 메시지 간격
+STREAM_FALLBACK_RELOAD_SECONDS = 5  # 변경 알림이 프로세스 밖으로 안 나가는 DB(SQLite)에서는 폴링처럼 주기적으로 다시 받게 한다
+
+controller = admission.AdmissionController(max_in_flight=ASYNC_MAX_IN_FLIGHT)
+
+
+class NotYourRoulette(Exception):
+    pass
+
+
+def async_database_url(sync_url):
+    """Flask 쪽 DB 주소를 async 드라이버 주소로 바꾼다. ASYNC_DATABASE_URL 이 있으면 그걸 쓴다."""
+    connect_args = {}
+    url = os.environ.get('ASYNC_DATABASE_URL')
+    if url:
+        return url, connect_args
+    backend = sync_url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"{backend} 는 async 경로를 지원하지 않습니다. ASYNC_DATABASE_URL 을 지정해주세요.")
+    url = sync_url.set(drivername=ASYNC_DRIVERS[backend])
+    if backend == 'postgresql' and 'sslmode' in url.query:
+        # asyncpg 는 sslmode 대신 ssl 인자를 받는다 (Railway 등의 ?sslmode=require)
+        connect_args['ssl'] = url.query['sslmode']
+        url = url.difference_update_query(['sslmode'])
+    return url, connect_args
+
+
+# --- Flask 세션 쿠키 ---
+
+def load_session(request):
+    flask_app = request.app.state.flask_app
+    value = request.cookies.get(flask_app.config['SESSION_COOKIE_NAME'])
+    if not value:
+        return {}
+    try:
+        return dict(request.app.state.session_serializer.loads(
+            value, max_age=int(flask_app.permanent_session_lifetime.total_seconds())))
+    except BadSignature:
+        return {}
+
+
+def save_session(request, response, session):
+    flask_app = request.app.state.flask_app
+    interface = flask_app.session_interface
+    response.set_cookie(
+        flask_app.config['SESSION_COOKIE_NAME'],
+        request.app.state.session_serializer.dumps(session),
+        domain=interface.get_cookie_domain(flask_app),
+        path=interface.get_cookie_path(flask_app),
+        httponly=interface.get_cookie_httponly(flask_app),
+        secure=interface.get_cookie_secure(flask_app),
+        samesite=interface.get_cookie_samesite(flask_app),
+    )
+    response.headers.append('Vary', 'Cookie')
+
+
+def session_identifier(request):
+    """flask_login 의 _create_identifier 와 같은 값 (세션 보호용 '_id')."""
+    address = request.headers.get('X-Forwarded-For', request.client.host if request.client else None)
+    if address is not None:
+        address = address.encode('utf-8').split(b',')[0].strip()
+    user_agent = request.headers.get('User-Agent')
+    if user_agent is not None:
+        user_agent = user_agent.encode('utf-8')
+    return hashlib.sha512(f"{address}|{user_agent}".encode('utf8')).hexdigest()
+
+
+def current_user_id(request):
+    user_id = load_session(request).get('_user_id')
+    try:
+        return int(user_id) if user_id is not None else None
+    except ValueError:
+        return None
+
+
+def unauthorized(request):
+    # Flask-Login 의 login_required 와 같이 로그인 페이지로 보낸다
+    return RedirectResponse(f"/login?next={quote(request.url.path)}", status_code=302)
+
+
+def message(text, status_code, **extra):
+    return JSONResponse({"message": text, **extra}, status_code=status_code)
+
+
+def validated_json(request, payload):
+    """Flask 쪽 http_cache 와 같은 규칙으로 압축하고 ETag 를 붙인 JSON 응답. 바뀌지 않았으면 304."""
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    status_code, body, headers = http_cache.represent(body, 'application/json',
+                                                      request.headers.get('accept-encoding'),
+                                                      request.headers.get('if-none-match'))
+    headers['Vary'] = 'Accept-Encoding'
+    headers['Cache-Control'] = http_cache.DEFAULT_CACHE_CONTROL
+    return Response(body, status_code=status_code, headers=headers,
+                    media_type='application/json' if status_code == 200 else None)
+
+
+# 지금 처리 중인 요청이 커넥션 풀에서 커넥션을 받기까지 기다린 시간의 합 (admission.TimedQueuePool 의 async 판)
+request_pool_wait = contextvars.ContextVar('request_pool_wait', default=None)
+
+
+@asynccontextmanager
+async def connect(engine):
+    """engine.connect() 와 같지만, 커넥션을 받기까지 걸린 시간을 지금 요청의 풀 대기 시간에 더한다."""
+    conn = engine.connect()
+    started = time.monotonic()
+    try:
+        await conn.start()
+    finally:
+        waited = request_pool_wait.get()
+        if waited is not None:
+            waited.append(time.monotonic() - started)
+    try:
+        yield conn
+    finally:
+        await asyncio.shield(conn.close())
+
+
+def admitted(endpoint):
+    """admission.py 와 같은 우선순위 규칙으로, 이벤트 루프가 넘치면 폴링부터 503 으로 돌려보낸다."""
+    def decorator(handler):
+        async def wrapper(request):
+            retry_after = controller.try_admit(endpoint)
+            if retry_after is not None:
+                return JSONResponse({"message": "요청이 많아 잠시 후 다시 시도해주세요.", "retry_after": retry_after},
+                                    status_code=503, headers={'Retry-After': str(retry_after)})
+            started = time.monotonic()
+            waited = []
+            token = request_pool_wait.set(waited)
+            try:
+                return await handler(request)
+            finally:
+                request_pool_wait.reset(token)
+                controller.release(endpoint, time.monotonic() - started, sum(waited) if waited else None)
+        return wrapper
+    return decorator
+
+
+# --- 잔액 변경 (app.update_balance 의 async 판) ---
+
+async def update_balance_async(engine, person_id, change, before_commit=None):
+    """
+    update_balance 와 같은 CAS 규칙. 최신 값(id, name, tickets, stars, version, 반 규칙)을 돌려주고, 사람이 없으면 None.
+
+    await before_commit(conn, person) 은 CAS 가 성공한 뒤 같은 트랜잭션 안에서 한 번만 불리고,
+    커밋된 뒤 알릴 변경 이벤트 목록을 돌려줄 수 있다. 예외를 던지면 잔액 변경까지 함께 롤백된다.
+    """
+    for attempt in range(BALANCE_UPDATE_RETRIES):
+        async with connect(engine) as conn:
+            # 반 규칙(당첨률, 재고)도 같이 읽어서 스핀 결과를 정할 때 다시 조회하지 않는다
+            person = (await conn.execute(
+                select(Person.id, Person.name, Person.tickets, Person.stars, Person.version, Person.room_id,
+                       Room.win_rate, Room.prize_stock)
+                .select_from(Person).outerjoin(Room, Room.id == Person.room_id)
+                .where(Person.id == person_id)
+            )).first()
+            if person is None:
+                return None
+
+            values = change(person)
+            if not values:
+                return person
+
+            swapped = (await conn.execute(
+                update(Person)
+                .where(Person.id == person_id, Person.version == person.version)
+                .values(version=person.version + 1, **values)
+            )).rowcount
+            if swapped == 1:
+                events = [{'k': 'person', **balance_change_fields(person, values, person.version + 1)}]
+                if before_commit is not None:
+                    events += await before_commit(conn, person) or []
+                for event in events:
+                    notify = change_bus.notify_statement(event)
+                    if notify is not None:
+                        await conn.execute(notify)
+                await conn.commit()
+                for event in events:
+                    change_bus.dispatch(event)
+                return SimpleNamespace(**{**person._asdict(), **values, 'version': person.version + 1})
+
+            await conn.rollback()
+        await asyncio.sleep(balance_retry_delay(attempt))
+
+    raise BalanceConflict(f"Balance update for person {person_id} kept conflicting after {BALANCE_UPDATE_RETRIES} attempts")
+
+
+# --- 라우트 ---
+
+@admitted('main.get_people_api')
+async def get_people_api(request):
+    user_id = current_user_id(request)
+    if user_id is None:
+        return unauthorized(request)
+    engine = request.app.state.engine
+    try:
+        # 어느 반인지 스냅샷으로 이미 알면 DB 에 가지 않는다
+        known, room_id = cached_person_room(user_id)
+        if not known:
+            async with connect(engine) as conn:
+                row = (await conn.execute(select(Person.room_id).where(Person.id == user_id))).first()
+            if row is None:
+                return unauthorized(request)
+            room_id = row.room_id
+        people, index, generation = cached_people_snapshot(room_id)
+        if people is None:
+            async with connect(engine) as conn:
+                rows = (await conn.execute(people_snapshot_query(room_id))).all()
+            people, index = store_people_snapshot(room_id, rows, generation)
+    except Exception as e:
+        print(f"Error getting people data: {e}")
+        return message("서버 오류로 이름 목록 가져오기 실패", 500, details=str(e))
+    # 스냅샷에 없는 사람 = 삭제된 계정 (Flask 의 load_user 가 None 을 돌려주는 경우와 같다)
+    if user_id not in index:
+        return unauthorized(request)
+    return validated_json(request, {"people": people})
+
+
+@admitted('main.spin_roulette')
+async def spin_roulette(request):
+    user_id = current_user_id(request)
+    if user_id is None:
+        return unauthorized(request)
+    try:
+        data = await request.json()
+        user_name = data.get('name')
+    except (ValueError, AttributeError):
+        return message("잘못된 요청입니다.", 400)
+
+    if not user_name:
+        return message('사용자 이름이 필요합니다.', 400)
+
+    def change(person):
+        if person.name != user_name:
+            raise NotYourRoulette()
+        return spin_ticket_change(person)
+
+    outcome = {}
+
+    async def settle_spin(conn, person):
+        # app.spin_roulette 와 같은 규칙: 룰렛권 차감과 같은 트랜잭션에서 반의 당첨률로 정하고,
+        # 재고가 정해져 있으면 재고를 가져와야 당첨. 스핀 기록(app.record_spin 과 같은 내용)도 여기서 남긴다.
+        win_rate = person.win_rate if person.win_rate is not None else ROULETTE_WIN_RATE
+        win = random.random() < win_rate
+        sold_out = False
+        if win and person.prize_stock is not None:
+            win = (await conn.execute(claim_prize_statement(person.room_id))).rowcount == 1
+            sold_out = not win
+        created_at = datetime.now()
+        spin_id = (await conn.execute(
+            insert(SpinHistory)
+            .values(person_id=person.id, room_id=person.room_id, win=win, created_at=created_at)
+            .returning(SpinHistory.id)
+        )).scalar_one()
+        event = {'k': 'spin', **spin_change_fields(spin_id, person.id, person.room_id, win, created_at)}
+        outcome.update(win=win, sold_out=sold_out, spin=spin_from_change(event))
+        return [event]
+
+    try:
+        person = await update_balance_async(request.app.state.engine, user_id, change, before_commit=settle_spin)
+    except NotYourRoulette:
+        return message('본인의 룰렛만 돌릴 수 있습니다.', 403)
+    except BalanceRejected as e:
+        return message(str(e), 400)
+    except BalanceConflict:
+        return message('다른 요청과 동시에 처리되어 실패했습니다. 다시 시도해주세요.', 409)
+    except Exception as e:
+        print(f"Error spinning roulette for {user_name}: {e}")
+        return message('서버 오류로 룰렛 돌리기 실패', 500, details=str(e))
+
+    if not person:
+        return unauthorized(request)
+
+    record_usage('spins', person.id)
+    return JSONResponse({
+        'message': f'{user_name}님의 룰렛권이 1개 차감되었습니다.',
+        'remaining_tickets': person.tickets,
+        'win': outcome['win'],
+        'sold_out': outcome['sold_out'],
+        'spin': outcome['spin']
+    })
+
+
+@admitted('main.recent_spins_api')
+async def recent_spins_api(request):
+    # 링 버퍼에 있는 사용자는 세션 쿠키만 보고 바로 돌려준다 (DB 를 전혀 읽지 않는다)
+    user_id = current_user_id(request)
+    if user_id is None:
+        return unauthorized(request)
+    spins = recent_spins.get(user_id)
+    if spins is None:
+        token = recent_spins.begin_load(user_id)
+        try:
+            async with connect(request.app.state.engine) as conn:
+                if (await conn.execute(select(Person.id).where(Person.id == user_id))).first() is None:
+                    return unauthorized(request)
+                rows = (await conn.execute(recent_spin_history_query(user_id))).all()
+        except Exception as e:
+            print(f"Error getting recent spins: {e}")
+            return message("서버 오류로 최근 스핀 가져오기 실패", 500, details=str(e))
+        spins = recent_spins.store(user_id, [
+            {'id': spin.id, 'win': spin.win, 'room_id': spin.room_id, 'created_at': spin.created_at.isoformat()}
+            for spin in rows
+        ], token)
+    return JSONResponse({"spins": spins})
+
+
+@admitted('main.login_api')
+async def login_api(request):
+    try:
+        data = await request.json()
+        name = data.get('name')
+        password = data.get('password')
+    except (ValueError, AttributeError):
+        return message("잘못된 요청입니다.", 400)
+
+    if not name or not password:
+        return message("아이디와 비밀번호를 모두 입력해주세요.", 400)
+
+    async with connect(request.app.state.engine) as conn:
+        user = (await conn.execute(
+            select(Person.id, Person.name, Person.password_hash, Person.is_admin).where(Person.name == name).limit(1)
+        )).first()
+
+    # 비밀번호 해시 비교는 CPU 를 많이 쓰므로 이벤트 루프를 막지 않도록 스레드에서 돌린다
+    if not user or not await run_in_threadpool(Person.check_password, user, password):
+        return message("잘못된 아이디 또는 비밀번호입니다.", 401)
+
+    # flask_login.login_user 가 세션에 남기는 것과 같은 값
+    session = load_session(request)
+    session.update({'_user_id': str(user.id), '_fresh': True, '_id': session_identifier(request)})
+    record_usage('logins', user.id)
+    print(f"User {user.name} logged in successfully.")
+    redirect_url = request.app.state.redirect_urls[bool(user.is_admin)]
+    response = JSONResponse({"message": "로그인 성공!", "redirect_url": redirect_url})
+    save_session(request, response, session)
+    return response
+
+
+# --- 반 목록 실시간 스트림 (SSE) ---
+
+class RoomStreams:
+    """
+    반별 스트림 구독자 목록. change_bus 핸들러는 아무 스레드(LISTEN 스레드, Flask 스레드)에서나 불리므로
+    이벤트 루프로 넘긴 뒤 그 반을 보고 있는 큐에만 넣는다.
+      event: person  data: {"id", "tickets", "stars"}   한 사람만 바뀜 -> 그 줄만 고친다
+      event: reload  data: {}                          여러 명이 바뀜 -> /api/get_people 로 다시 받는다
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.queues = {}  # room_id -> {asyncio.Queue}
+
+    def handle_change(self, change):
+        loop = self.loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._fan_out, change)
+
+    def _fan_out(self, change):
+        if change['k'] in ('spin', 'spins'):
+            return  # 스핀 기록은 반 목록과 상관없다
+        if change['k'] in ('person', 'people') and 'r' in change:
+            targets = self.queues.get(change['r'], ())
+        else:
+            targets = [queue for queues in self.queues.values() for queue in queues]
+        if change['k'] == 'person' and 'r' in change:
+            message = ('person', {'id': change['id'], 'tickets': change['t'], 'stars': change['s']})
+        else:
+            message = ('reload', {})
+        for queue in targets:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # 못 따라오는 클라이언트는 밀린 이벤트를 버리고 목록을 통째로 다시 받게 한다
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(('reload', {}))
+
+    def subscribe(self, room_id):
+        queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        self.queues.setdefault(room_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, room_id, queue):
+        queues = self.queues.get(room_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.queues[room_id]
+
+
+room_streams = RoomStreams()
+
+
+def sse_message(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def room_stream(request):
+    # 연결이 오래 유지되므로 admission control 의 처리 중 요청 수에는 넣지 않는다
+    user_id = current_user_id(request)
+    if user_id is None:
+        return unauthorized(request)
+    room_id = request.path_params['room_id']
+    async with connect(request.app.state.engine) as conn:
+        user = (await conn.execute(select(Person.room_id, Person.is_admin).where(Person.id == user_id))).first()
+        room_exists = (await conn.execute(select(Room.id).where(Room.id == room_id))).first() is not None
+    if user is None:
+        return unauthorized(request)
+    if not user.is_admin and user.room_id != room_id:
+        return message("자기 반만 볼 수 있습니다.", 403)
+    if not room_exists:
+        return message("해당 반을 찾을 수 없습니다.", 404)
+
+    distributed = change_bus.is_distributed
+    idle_timeout = STREAM_HEARTBEAT_SECONDS if distributed else STREAM_FALLBACK_RELOAD_SECONDS
+
+    async def events():
+        queue = room_streams.subscribe(room_id)
+        try:
+            # 구독 전에 지나간 변경이 있을 수 있으므로 처음에는 목록을 한 번 다시 받게 한다
+            yield sse_message('reload', {})
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=idle_timeout)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n' if distributed else sse_message('reload', {})
+                    continue
+                yield sse_message(event, data)
+        finally:
+            room_streams.unsubscribe(room_id, queue)
+
+    return StreamingResponse(events(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@asynccontextmanager
+async def lifespan(app):
+    flask_app = app.state.flask_app
+    url, connect_args = async_database_url(app.state.sync_url)
+    app.state.engine = create_async_engine(
+        url,
+        connect_args=connect_args,
+        pool_pre_ping=True,
+        pool_size=int(os.environ.get('ASYNC_DB_POOL_SIZE', '10')),
+        max_overflow=int(os.environ.get('ASYNC_DB_MAX_OVERFLOW', '20')),
+    )
+    # Flask 쪽 요청을 한 번도 안 받아도 백그라운드 작업(캠페인, 통계 저장, 변경 알림 수신)은 돌아야 한다
+    with flask_app.app_context():
+        start_campaign_runner()
+        start_analytics_flusher()
+        change_bus.start_listener()
+    room_streams.loop = asyncio.get_running_loop()
+    try:
+        yield
+    finally:
+        room_streams.loop = None
+        await app.state.engine.dispose()
+
+
+def build_app(flask_app=None):
+    """
+    Starlette 앱을 만든다 (uvicorn 의 factory). 워커 프로세스마다 한 번 불린다.
+
+    flask_app 을 주지 않으면 create_app() 으로 새로 만든다. DB 에는 접속하지 않는다.
+    """
+    flask_app = flask_app or create_app()
+    app = Starlette(
+        routes=[
+            Route('/api/get_people', get_people_api, methods=['GET']),
+            Route('/api/spin_roulette', spin_roulette, methods=['POST']),
+            Route('/api/login', login_api, methods=['POST']),
+            Route('/api/spin_history/recent', recent_spins_api, methods=['GET']),
+            Route('/api/rooms/{room_id:int}/stream', room_stream, methods=['GET']),
+            Mount('/', app=WSGIMiddleware(flask_app, workers=WSGI_THREADS)),
+        ],
+        lifespan=lifespan,
+    )
+    app.state.flask_app = flask_app
+    app.state.session_serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    with flask_app.app_context():
+        # 상대 경로 sqlite 도 Flask-SQLAlchemy 가 instance 폴더 기준으로 바꾼 주소를 그대로 쓴다
+        app.state.sync_url = db.engine.url
+        app.state.redirect_urls = {
+            True: flask_app.url_map.bind('').build('main.admin_page'),
+            False: flask_app.url_map.bind('').build('main.roulette_page'),
+        }
+    change_bus.subscribe(room_streams.handle_change)
+    return app
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    workers = int(os.environ.get('WEB_CONCURRENCY', '1'))
+    options = dict(host='0.0.0.0', port=int(os.environ.get('PORT', '8000')),
+                   proxy_headers=True, forwarded_allow_ips='*', access_log=False)
+    flask_app = create_app()
+    bootstrap(flask_app)
+    if workers == 1:
+        # 워커가 하나면 이 프로세스가 바로 요청을 받으므로 방금 만든 앱을 그대로 넘긴다
+        uvicorn.run(build_app(flask_app), **options)
+    else:
+        # 워커 프로세스가 각자 build_app() 으로 앱을 만든다. 여기서 만든 앱은 스키마 준비에만 쓰고 커넥션을 돌려준다
+        with flask_app.app_context():
+            db.engine.dispose()
+        uvicorn.run('asgi:build_app', factory=True, workers=workers, **options)
@@ -0,0 +1,179 @@
+# bench_serving.py
+# 같은 DB 에 띄운 sync(gunicorn gthread) 서버와 async(uvicorn) 서버에 같은 부하를 걸어 비교하는 벤치마크.
+#
+#   # 터미널 1: 코어 하나씩만 쓰도록 워커 1개로 띄운다
+#   WEB_CONCURRENCY=1 PORT=8000 gunicorn
+#   WEB_CONCURRENCY=1 PORT=8001 python asgi.py
+#
+#   # 터미널 2
+#   python bench_serving.py --url http://127.0.0.1:8000 --clients 500 --think 1
+#   python bench_serving.py --url http://127.0.0.1:8001 --clients 500 --think 1
+#
+# 클라이언트마다 벤치마크용 계정(bench-...)으로 로그인한 뒤, --think 초마다 룰렛 탭처럼
+# /api/get_people 를 부르고 --spin-ratio 비율로 /api/spin_roulette 를 섞는다.
+# 끝나면 경로별 처리량(req/s), 지연 시간(p50/p95/p99), 상태 코드별 개수를 출력하고 계정을 지운다.
+# 503 은 서버가 과부하로 요청을 버린 것(admission control)이므로 실패와 따로 센다.
+import argparse
+import asyncio
+import http.cookiejar
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+
+import httpx
+
+
+def _no_cookie_jar():
+    # 클라이언트마다 세션 쿠키를 따로 보내야 하므로 공용 쿠키 저장소는 아무것도 저장하지 않게 한다
+    return httpx.Cookies(http.cookiejar.CookieJar(policy=http.cookiejar.DefaultCookiePolicy(allowed_domains=[])))
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    def add(self, endpoint, status, latency):
+        self.statuses[endpoint][status] += 1
+        if status < 500:
+            self.latencies[endpoint].append(latency)
+
+
+def _percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+async def admin_login(client, password):
+    response = await client.post('/api/login', json={'name': 'admin', 'password': password})
+    if response.status_code != 200:
+        raise SystemExit(f"관리자 로그인 실패 ({response.status_code}): {response.text}")
+    return {'Cookie': f"session={response.cookies['session']}"}
+
+
+async def create_bench_users(client, admin_headers, prefix, count, tickets):
+    """가져오기 API 로 벤치마크 계정을 한 번에 만든다."""
+    lines = [json.dumps({'name': f'{prefix}{i}', 'password': 'bench-password', 'tickets': tickets})
+             for i in range(count)]
+    response = await client.post('/api/admin/import', headers=admin_headers, timeout=600,
+                                 files={'file': ('bench.ndjson', '\n'.join(lines).encode('utf-8'))})
+    if response.status_code != 200 or response.json().get('imported') != count:
+        raise SystemExit(f"벤치마크 계정 생성 실패 ({response.status_code}): {response.text[:500]}")
+
+
+async def delete_bench_users(client, admin_headers, prefix):
+    ids = []
+    offset = 0
+    while True:
+        response = await client.get('/api/admin/people', headers=admin_headers,
+                                    params={'q': prefix, 'offset': offset, 'limit': 200})
+        people = response.json().get('people', [])
+        ids += [p['id'] for p in people if p['name'].startswith(prefix)]
+        offset += len(people)
+        if not people:
+            break
+    for person_id in ids:
+        await client.delete(f'/api/delete_person/{person_id}', headers=admin_headers)
+    return len(ids)
+
+
+async def run_client(client, name, stats, think, spin_ratio, start_barrier):
+    """로그인 후 취소될 때까지 룰렛 탭처럼 폴링/스핀을 반복한다."""
+    started = time.perf_counter()
+    try:
+        response = await client.post('/api/login', json={'name': name, 'password': 'bench-password'})
+        stats.add('login', response.status_code, time.perf_counter() - started)
+    except httpx.HTTPError as e:
+        response = None
+        stats.statuses['login'][type(e).__name__] += 1
+    await start_barrier.wait()
+    if response is None or response.status_code != 200:
+        return
+    headers = {'Cookie': f"session={response.cookies['session']}"}
+
+    # 모든 탭이 같은 순간에 폴링하지 않도록 처음 한 번은 무작위로 쉰다
+    await asyncio.sleep(random.uniform(0, think))
+    while True:
+        if random.random() < spin_ratio:
+            endpoint, request = 'spin_roulette', client.post('/api/spin_roulette', json={'name': name}, headers=headers)
+        else:
+            endpoint, request = 'get_people', client.get('/api/get_people', headers=headers)
+        started = time.perf_counter()
+        try:
+            response = await request
+            status = response.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+            stats.statuses[endpoint][status] += 1
+        else:
+            stats.add(endpoint, status, time.perf_counter() - started)
+        if think:
+            await asyncio.sleep(think)
+
+
+def print_report(stats, args):
+    duration = args.duration
+    print(f"=== {args.url}: 클라이언트 {args.clients}명, {duration:.1f}초, 요청 사이 {args.think}초 ===")
+    for endpoint in ('login', 'get_people', 'spin_roulette'):
+        statuses = stats.statuses.get(endpoint)
+        if not statuses:
+            continue
+        latencies = stats.latencies[endpoint]
+        total = sum(statuses.values())
+        # 로그인은 측정 시작 전에 한 번씩만 하므로 처리량 대신 횟수만 보여준다
+        rate = f"{total / duration:,.1f} req/s" if endpoint != 'login' else f"{total}회"
+        print(f"  {endpoint:<14} {rate:>14}   p50 {_percentile(latencies, 50) * 1000:7.1f}ms  "
+              f"p95 {_percentile(latencies, 95) * 1000:7.1f}ms  p99 {_percentile(latencies, 99) * 1000:7.1f}ms")
+        print(f"  {'':<14} 상태: " + ', '.join(f"{status} x {count}" for status, count in sorted(statuses.items(), key=str)))
+
+
+async def main_async(args):
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout,
+                                 cookies=_no_cookie_jar()) as client:
+        admin_headers = await admin_login(client, args.admin_password)
+        prefix = f"bench-{os.getpid()}-"
+        await create_bench_users(client, admin_headers, prefix, args.clients, args.tickets)
+        try:
+            stats = Stats()
+            start_barrier = asyncio.Barrier(args.clients + 1)
+            tasks = [asyncio.create_task(run_client(client, f"{prefix}{i}", stats, args.think,
+                                                    args.spin_ratio, start_barrier))
+                     for i in range(args.clients)]
+            # 모두 로그인한 뒤부터 duration 초 동안 잰다 (로그인에 실패한 클라이언트도 barrier 는 통과한다)
+            await start_barrier.wait()
+            await asyncio.sleep(args.duration)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            print_report(stats, args)
+        finally:
+            deleted = await delete_bench_users(client, admin_headers, prefix)
+            print(f"벤치마크 계정 {deleted}개를 삭제했습니다.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="sync / async 서버 처리량 비교 벤치마크")
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--clients', type=int, default=200, help="동시에 접속한 룰렛 탭 수")
+    parser.add_argument('--duration', type=float, default=30.0, help="측정 시간(초)")
+    parser.add_argument('--think', type=float, default=1.0, help="클라이언트가 요청 사이에 쉬는 시간(초), 0 이면 쉬지 않음")
+    parser.add_argument('--spin-ratio', type=float, default=0.1, help="요청 중 스핀 비율")
+    parser.add_argument('--tickets', type=int, default=100_000, help="벤치마크 계정마다 줄 룰렛권")
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--admin-password', default=os.environ.get('ADMIN_PASSWORD', 'seoan1024'))
+    args = parser.parse_args(argv)
+
+    if args.clients < 1 or args.duration <= 0 or args.think < 0 or not 0.0 <= args.spin_ratio <= 1.0:
+        parser.error("--clients 는 1 이상, --duration 은 0 보다 크고, --spin-ratio 는 0과 1 사이여야 합니다.")
+    asyncio.run(main_async(args))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
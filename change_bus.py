@@ -0,0 +1,161 @@
+# change_bus.py
+# 여러 워커/호스트 사이에 "누구의 잔액이 바뀌었다"를 알려주는 변경 알림 버스.
+#
+# 워커마다 메모리 캐시를 두면, 한 워커에서 룰렛권을 준 것을 다른 워커는 모른다.
+# 그래서 값을 바꾸는 코드는 커밋 전에 publish() 로 짧은 이벤트를 남기고,
+#   - Postgres: 같은 트랜잭션 안에서 pg_notify 를 보낸다 -> 커밋될 때만 모든 워커의 LISTEN 스레드에 전달된다.
+#   - 그 외(SQLite): 같은 프로세스 안에서만, 커밋된 뒤에 구독자에게 바로 전달한다.
+# 어느 쪽이든 이벤트를 만든 프로세스는 커밋 직후 자기 구독자에게 바로 전달하고,
+# LISTEN 으로 되돌아온 자기 이벤트는 origin 으로 걸러서 두 번 처리하지 않는다.
+#
+# 이벤트는 NOTIFY 페이로드 제한(8000바이트) 안에 들어가도록 짧은 키를 쓴다.
+#   {"k": "person", "id": 5, "r": 2, "t": 3, "s": 1, "v": 7}   2반(r) 한 사람의 룰렛권(t)/별점(s)/버전(v)이 바뀜
+#   {"k": "people", "r": 2}                           2반의 여러 명이 바뀜 (추가/삭제), r 이 없으면 어느 반인지 모름
+#                                                     (캠페인, 가져오기, 반 이동) -> 전부 무효화
+#   {"k": "resync"}                                   LISTEN 연결이 끊겼다 다시 붙음 -> 놓친 이벤트가 있을 수 있으니 전부 무효화
+#   {"k": "spin", "id": 5, "h": 91, "r": 2, "w": true, "at": "..."}   5번이 룰렛을 돌림 (스핀 기록 91번)
+#   {"k": "spins", "id": 5}                           5번의 스핀 기록이 지워짐 (사용자 삭제)
+import json
+import os
+import threading
+import time
+import uuid
+
+from sqlalchemy import event, text
+
+CHANNEL = 'imok_changes'
+LISTEN_POLL_SECONDS = 5.0
+RECONNECT_MAX_DELAY = 30.0
+
+
+class ChangeBus:
+    def __init__(self):
+        self._origin_base = uuid.uuid4().hex[:12]
+        self._handlers = []
+        self._db = None
+        self._dialect = None
+        self._app = None
+        self._listener_started = False
+        self._listener_pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def origin(self):
+        # --preload 면 워커들이 master 의 객체를 그대로 물려받으므로 pid 까지 붙여야 워커마다 달라진다
+        return f"{self._origin_base}-{os.getpid()}"
+
+    @property
+    def is_distributed(self):
+        """다른 프로세스/호스트까지 이벤트가 전달되는지 (Postgres 일 때만)."""
+        return self._db is not None and self._dialect == 'postgresql'
+
+    def init_app(self, app, db):
+        self._app = app
+        self._db = db
+        with app.app_context():
+            self._dialect = db.engine.dialect.name
+
+        session_class = db.session.session_factory.class_
+        # 같은 세션 클래스에 리스너가 두 번 붙지 않도록
+        if not event.contains(session_class, 'after_commit', self._after_commit):
+            event.listen(session_class, 'after_commit', self._after_commit)
+            event.listen(session_class, 'after_soft_rollback', self._after_rollback)
+
+        @app.before_request
+        def start_change_listener():
+            self.start_listener()
+
+    def subscribe(self, handler):
+        """handler(event_dict) 는 워커마다 여러 스레드에서 불릴 수 있으므로 스스로 잠금을 처리해야 한다."""
+        self._handlers.append(handler)
+
+    def publish(self, kind, **fields):
+        """지금 트랜잭션이 커밋되면 전달될 이벤트를 남긴다. 롤백되면 버려진다."""
+        change = {'k': kind, **fields}
+        session = self._db.session
+        session.info.setdefault('change_events', []).append(change)
+        notify = self.notify_statement(change)
+        if notify is not None:
+            session.execute(notify)
+
+    def notify_statement(self, change):
+        """
+        다른 프로세스에 change 를 알리는 pg_notify 문. Postgres 가 아니면 None.
+
+        Flask 세션 밖(asgi.py 의 async 엔진)에서 쓸 때는 같은 트랜잭션 안에서 실행하고,
+        커밋한 뒤에 dispatch(change) 를 직접 불러야 한다.
+        """
+        if self._dialect != 'postgresql':
+            return None
+        payload = json.dumps({**change, 'o': self.origin}, separators=(',', ':'))
+        return text("SELECT pg_notify(:channel, :payload)").bindparams(channel=CHANNEL, payload=payload)
+
+    def dispatch(self, change):
+        for handler in self._handlers:
+            try:
+                handler(change)
+            except Exception as e:
+                print(f"Error handling change event {change}: {e}")
+
+    def _after_commit(self, session):
+        for change in session.info.pop('change_events', ()):
+            self.dispatch(change)
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop('change_events', None)
+
+    # --- Postgres LISTEN 스레드 ---
+
+    def start_listener(self):
+        # fork 된 워커에서는 부모의 스레드가 없으므로 프로세스마다 따로 시작한다
+        if not self.is_distributed or (self._listener_started and self._listener_pid == os.getpid()):
+            return
+        with self._lock:
+            if self._listener_started and self._listener_pid == os.getpid():
+                return
+            self._listener_started = True
+            self._listener_pid = os.getpid()
+            threading.Thread(target=self._listen_forever, name='change-listener', daemon=True).start()
+
+    def _listen_forever(self):
+        import select
+
+        delay = 1.0
+        while True:
+            try:
+                with self._app.app_context():
+                    raw = self._db.engine.raw_connection()
+                try:
+                    connection = raw.driver_connection
+                    connection.autocommit = True
+                    with connection.cursor() as cursor:
+                        cursor.execute(f"LISTEN {CHANNEL}")
+                    # LISTEN 을 걸기 전(처음 시작하거나 끊겨 있던 동안)의 이벤트는 못 받았을 수 있다
+                    self.dispatch({'k': 'resync'})
+                    delay = 1.0
+
+                    while True:
+                        if select.select([connection], [], [], LISTEN_POLL_SECONDS) == ([], [], []):
+                            continue
+                        connection.poll()
+                        while connection.notifies:
+                            notification = connection.notifies.pop(0)
+                            self._handle_notification(notification.payload)
+                finally:
+                    raw.invalidate()
+            except Exception as e:
+                print(f"Change listener disconnected: {e}. Reconnecting in {delay:.0f}s.")
+                time.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    def _handle_notification(self, payload):
+        try:
+            change = json.loads(payload)
+        except ValueError:
+            return
+        if change.pop('o', None) == self.origin:
+            return  # 이 프로세스가 보낸 이벤트는 커밋 직후 이미 처리했다
+        self.dispatch(change)
+
+
+change_bus = ChangeBus()
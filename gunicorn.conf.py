@@ -0,0 +1,22 @@
+# gunicorn.conf.py
+# gunicorn 은 현재 폴더의 이 파일을 자동으로 읽는다. 그냥 `gunicorn` 으로 실행하면 된다.
+#
+# preload_app: master 가 앱을 한 번만 import 하고 워커는 fork 로 복사해 가므로 워커 시작/교체가 빠르다.
+# 스키마/관리자 계정 준비(bootstrap)는 master 의 on_starting 에서 한 번만 하고, 워커는 하지 않는다.
+# 워커가 부모의 DB 커넥션을 같이 쓰지 않도록 create_app() 이 fork 직후 엔진 풀을 버린다.
+import os
+
+wsgi_app = 'wsgi:app'
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+# 워커마다 스레드 여러 개. admission.py 가 스레드 수만큼을 "처리 중 요청 최대치"로 보고 넘치면 폴링부터 버린다
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+raw_env = [f"ADMISSION_MAX_IN_FLIGHT={os.environ.get('ADMISSION_MAX_IN_FLIGHT', threads)}"]
+preload_app = True
+
+
+def on_starting(server):
+    from app import bootstrap
+
+    bootstrap(server.app.wsgi())
@@ -0,0 +1,149 @@
+# http_cache.py
+# 응답 압축(gzip / brotli)과 캐시 검증자(ETag, 304 Not Modified).
+#
+# 룰렛 탭은 5초마다 /api/get_people 를 부르는데, 같은 반 학생들은 대부분 같은 목록을 받고
+# 그 목록도 대부분 직전과 같다. 그래서
+#   - 본문 해시로 ETag 를 만들어, 브라우저가 If-None-Match 로 물어보면 본문 없이 304 만 보낸다.
+#   - MIN_SIZE 이상인 텍스트/JSON 은 Accept-Encoding 에 맞춰 압축하고,
+#     압축한 바이트는 (본문 해시, 인코딩) 으로 LRU 에 남겨 같은 본문을 두 번 압축하지 않는다.
+#   - Last-Modified 는 보내지 않는다. 데이터가 언제 바뀌었는지는 워커마다 알 수 없어서
+#     "이 프로세스가 본문을 처음 본 시각" 밖에 못 쓰는데, 그 값은 내용이 되돌아가거나(A->B->A)
+#     1초 안에 두 번 바뀌면 틀린 304 를 만든다. 그래서 If-Modified-Since 도 보지 않고 ETag 로만 검증한다.
+# Flask 쪽은 init_app(app) 의 after_request 가, asgi.py 의 async 라우트는 represent() 를 직접 불러서 쓴다.
+# 스트리밍 응답(내보내기, SSE)과 파일 응답(direct_passthrough)은 건드리지 않는다.
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from flask import request
+from werkzeug.http import parse_accept_header, parse_etags
+
+try:
+    import brotli
+except ImportError:  # 설치되어 있지 않으면 gzip 만 쓴다
+    brotli = None
+
+MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', '1024'))  # 이보다 작은 본문은 압축해도 얻는 게 거의 없다
+CACHE_MAX_BYTES = int(os.environ.get('HTTP_CACHE_MAX_BYTES', str(8 * 1024 * 1024)))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # 응답마다 압축하므로 최고 압축률보다 속도를 택한다
+COMPRESSIBLE_TYPES = {'text/html', 'text/plain', 'text/css', 'text/csv', 'application/json',
+                      'application/javascript', 'application/x-ndjson'}
+# 로그인한 사람마다 내용이 다르므로 공유 캐시(프록시)에는 남기지 않고, 브라우저는 매번 검증하게 한다
+DEFAULT_CACHE_CONTROL = 'private, no-cache'
+
+
+class CompressionCache:
+    """(본문 해시, 인코딩) -> 압축한 바이트. 전체 크기가 max_bytes 를 넘으면 오래 안 쓴 것부터 버린다."""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def compressed(self, digest, encoding, body):
+        key = (digest, encoding)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return cached
+            self.misses += 1
+
+        # 압축은 잠금 밖에서 한다. 같은 본문을 두 스레드가 동시에 압축할 수는 있지만 결과는 같다.
+        data = compress(body, encoding)
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = data
+                self._size += len(data)
+                while self._size > self.max_bytes and len(self._entries) > 1:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._size -= len(evicted)
+        return data
+
+    def snapshot(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._size, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+cache = CompressionCache()
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def negotiate_encoding(accept_encoding):
+    """Accept-Encoding 헤더에서 쓸 인코딩('br', 'gzip')을 고른다. 둘 다 안 되면 None."""
+    accept = parse_accept_header(accept_encoding)
+    if brotli is not None and accept.quality('br') > 0:
+        return 'br'
+    if accept.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+def body_digest(body):
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def is_compressible(mimetype):
+    return mimetype in COMPRESSIBLE_TYPES
+
+
+def represent(body, mimetype, accept_encoding=None, if_none_match=None):
+    """
+    본문 하나에 대해 (상태 코드, 보낼 바이트, 추가할 헤더) 를 정한다.
+
+    ETag 는 인코딩마다 다른 강한 ETag ("해시", "해시-gzip", "해시-br") 다. 압축된 바이트는 원본과 다른 표현이기 때문이다.
+    If-None-Match 는 해시 부분만 비교하므로, 다른 인코딩으로 받아 둔 사본이어도 내용이 같으면 304 다.
+    """
+    digest = body_digest(body)
+    encoding = None
+    if len(body) >= MIN_SIZE and is_compressible(mimetype):
+        encoding = negotiate_encoding(accept_encoding)
+    headers = {'ETag': f'"{digest}-{encoding}"' if encoding else f'"{digest}"'}
+
+    if if_none_match:
+        etags = parse_etags(if_none_match)
+        if etags.star_tag or any(tag.split('-', 1)[0] == digest for tag in etags.as_set(include_weak=True)):
+            return 304, b'', headers
+
+    if encoding is not None:
+        body = cache.compressed(digest, encoding, body)
+        headers['Content-Encoding'] = encoding
+    return 200, body, headers
+
+
+def init_app(app):
+    app.extensions['http_cache'] = cache
+
+    @app.after_request
+    def compress_and_validate(response):
+        if (request.method not in ('GET', 'HEAD') or response.status_code != 200
+                or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers or not is_compressible(response.mimetype)):
+            return response
+
+        status, body, headers = represent(response.get_data(), response.mimetype,
+                                          request.headers.get('Accept-Encoding'),
+                                          request.headers.get('If-None-Match'))
+        response.status_code = status
+        response.set_data(body)
+        if status == 304:
+            response.headers.pop('Content-Length', None)
+        response.headers.update(headers)
+        response.vary.add('Accept-Encoding')
+        response.headers.setdefault('Cache-Control', DEFAULT_CACHE_CONTROL)
+        return response
+
+    return cache
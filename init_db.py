@@ -1,23 +1,16 @@
 # init_db.py
-from app import app, db, Person
-from werkzeug.security import generate_password_hash
-import os
-from datetime import date
+#   python init_db.py          -> 없는 테이블/컬럼과 관리자 계정만 만든다 (기존 데이터 유지)
+#   python init_db.py --reset  -> 모든 테이블을 삭제하고 새로 만든다!
+import sys
 
-with app.app_context():
-    print("기존의 모든 테이블을 삭제합니다...")
-    db.drop_all() # <-- 모든 테이블 삭제!
+from app import create_app, db, bootstrap
 
-    print("새로운 테이블을 생성합니다...")
-    db.create_all() # <-- 새로운 구조로 테이블 생성!
+app = create_app()
 
-    if not Person.query.filter_by(name='admin').first():
-        admin_password = os.getenv("ADMIN_PASSWORD", "super-secret-password-to-change")
+if '--reset' in sys.argv:
+    with app.app_context():
+        print("기존의 모든 테이블을 삭제합니다...")
+        db.drop_all() # <-- 모든 테이블 삭제!
 
-        admin_user = Person(name='admin', is_admin=True)
-        admin_user.set_password("seoan1024")
-        db.session.add(admin_user)
-        db.session.commit()
-        print("Admin user created!")
-    else:
-        print("Admin user already exists.")
+print("테이블과 관리자 계정을 준비합니다...")
+bootstrap(app)
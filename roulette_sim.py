@@ -0,0 +1,231 @@
+# roulette_sim.py
+# 룰렛 당첨률 / 별점->룰렛권 규칙을 바꾸기 전에 효과를 미리 돌려보는 몬테카를로 시뮬레이터.
+#
+#   python roulette_sim.py --people 10000 --rounds 100 --trials 20
+#   python roulette_sim.py --from-db --rounds 30 --win-rate 0.2 --prize-stock 500
+#
+# 한 "라운드"는 하루라고 생각하면 된다. 라운드마다
+#   1) 관리자가 별점을 준다 (1인당 평균 --star-rate 개, 포아송 분포)
+#   2) give_star_change 와 똑같이 별점을 하나씩 받을 때마다, 모인 별점이 반의 기준 이상이면 룰렛권 +1, 별점 0
+#      (한 라운드에 기준의 몇 배를 받으면 그만큼 룰렛권이 나오고, 남은 별점은 다음 라운드로 넘어간다)
+#   3) 가진 룰렛권 중 --spend-rate 비율만큼 룰렛을 돌리고, 각 스핀은 --win-rate 확률로 당첨
+#   4) 당첨 1번마다 상품 재고가 1개씩 줄어든다
+# 스핀을 하나씩 뽑지 않고 (trials x people) 배열에 이항분포로 한 번에 뽑기 때문에
+# 천만 번 스핀도 몇 초 안에 끝난다.
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from app import ROULETTE_WIN_RATE, STARS_PER_TICKET
+
+WIN_HISTOGRAM_CAP = 10  # 당첨 횟수 분포에서 이 값 이상은 한 칸으로 묶는다
+
+
+def load_population_from_db():
+    """
+    Person 테이블에서 관리자를 뺀 사용자들의 (tickets, stars, stars_per_ticket) 배열을 읽어온다.
+
+    stars_per_ticket 은 그 사람이 속한 반의 기준이고, 반이 없으면 STARS_PER_TICKET 이다.
+    """
+    from sqlalchemy import func
+
+    from app import create_app, db, Person, Room
+
+    with create_app().app_context():
+        rows = db.session.query(Person.tickets, Person.stars,
+                                func.coalesce(Room.stars_per_ticket, STARS_PER_TICKET)) \
+            .outerjoin(Room, Room.id == Person.room_id).filter(Person.is_admin.is_(False)).all()
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    data = np.asarray(rows, dtype=np.int64)
+    return data[:, 0], data[:, 1], data[:, 2]
+
+
+def synthetic_population(people, init_tickets, init_stars):
+    tickets = np.full(people, init_tickets, dtype=np.int64)
+    stars = np.full(people, init_stars, dtype=np.int64)
+    return tickets, stars
+
+
+def award_stars(tickets, stars, awarded, stars_per_ticket):
+    """
+    별점을 awarded 개씩 하나하나 give_star_change 로 준 것과 같은 (tickets, stars, 지급된 룰렛권) 을 배열로 계산한다.
+
+    별점은 하나씩 오르므로 기준에 닿는 순간 바로 룰렛권으로 바뀌고 0 이 된다.
+    기준이 낮아져 이미 기준 이상 모여 있던 사람만 첫 별점에서 룰렛권 1개를 받고 나머지 별점을 잃는다 (_convert_stars).
+    """
+    given = awarded > 0
+    # 첫 별점에서 바로 바뀌는 사람은 그 뒤 (awarded - 1) 개를 0 부터 다시 모은다
+    first_converts = given & (stars + 1 >= stars_per_ticket)
+    collected = np.where(first_converts, awarded - 1, stars + awarded)
+    granted = np.where(given, first_converts + collected // stars_per_ticket, 0)
+    stars = np.where(given, collected % stars_per_ticket, stars)
+    return tickets + granted, stars, granted
+
+
+def simulate(tickets0, stars0, rounds, trials, win_rate, stars_per_ticket, star_rate,
+             spend_rate, prize_stock=None, batch_size=1_000_000, seed=None):
+    """
+    시뮬레이션을 돌리고 집계 결과를 dict 로 돌려준다.
+
+    stars_per_ticket 은 모두에게 같은 값이거나, 사람마다 (반마다) 다른 값의 배열이다.
+    사람 수가 많으면 (trials x people) 배열이 커지므로 사람 단위로 batch_size 씩 잘라서 돌린다.
+    상품 재고는 라운드별 당첨 수를 모두 더한 뒤에 계산하므로 배치를 나눠도 결과가 같다.
+    """
+    rng = np.random.default_rng(seed)
+    people = len(tickets0)
+
+    granted_per_round = np.zeros((trials, rounds), dtype=np.int64)
+    spins_per_round = np.zeros((trials, rounds), dtype=np.int64)
+    wins_per_round = np.zeros((trials, rounds), dtype=np.int64)
+    outstanding_per_round = np.zeros((trials, rounds), dtype=np.int64)
+    win_hist = np.zeros(WIN_HISTOGRAM_CAP + 1, dtype=np.int64)
+
+    rows_per_batch = max(1, batch_size // max(1, trials))
+    for start in range(0, people, rows_per_batch):
+        stop = min(people, start + rows_per_batch)
+        tickets = np.broadcast_to(tickets0[start:stop], (trials, stop - start)).copy()
+        stars = np.broadcast_to(stars0[start:stop], (trials, stop - start)).copy()
+        batch_stars_per_ticket = stars_per_ticket[start:stop] if np.ndim(stars_per_ticket) else stars_per_ticket
+        wins_total = np.zeros_like(tickets)
+
+        for r in range(rounds):
+            awarded = rng.poisson(star_rate, size=stars.shape)
+            tickets, stars, granted = award_stars(tickets, stars, awarded, batch_stars_per_ticket)
+
+            spins = rng.binomial(tickets, spend_rate)
+            tickets -= spins
+            wins = rng.binomial(spins, win_rate)
+            wins_total += wins
+
+            granted_per_round[:, r] += granted.sum(axis=1)
+            spins_per_round[:, r] += spins.sum(axis=1)
+            wins_per_round[:, r] += wins.sum(axis=1)
+            outstanding_per_round[:, r] += tickets.sum(axis=1)
+
+        win_hist += np.bincount(np.minimum(wins_total, WIN_HISTOGRAM_CAP).ravel(),
+                                minlength=WIN_HISTOGRAM_CAP + 1)
+
+    result = {
+        'people': people,
+        'rounds': rounds,
+        'trials': trials,
+        'initial_tickets': int(tickets0.sum()),
+        'granted_per_round': granted_per_round,
+        'spins_per_round': spins_per_round,
+        'wins_per_round': wins_per_round,
+        'outstanding_per_round': outstanding_per_round,
+        'win_histogram': win_hist,
+        'total_spins': int(spins_per_round.sum()),
+        'total_wins': int(wins_per_round.sum()),
+    }
+
+    if prize_stock is not None:
+        cumulative_wins = np.cumsum(wins_per_round, axis=1)
+        stock_left = np.maximum(prize_stock - cumulative_wins, 0)
+        exhausted = cumulative_wins >= prize_stock
+        # 재고가 처음 0이 된 라운드 (1부터 셈), 끝까지 남아 있으면 -1
+        exhausted_round = np.where(exhausted.any(axis=1), exhausted.argmax(axis=1) + 1, -1)
+        result['stock_left_per_round'] = stock_left
+        result['exhausted_round'] = exhausted_round
+        result['unfulfilled_wins'] = np.maximum(cumulative_wins[:, -1] - prize_stock, 0)
+
+    return result
+
+
+def _percentiles(values):
+    p10, p50, p90 = np.percentile(values, [10, 50, 90])
+    return f"p10 {p10:,.1f} / 중앙값 {p50:,.1f} / p90 {p90:,.1f}"
+
+
+def print_report(result, prize_stock, elapsed):
+    trials = result['trials']
+    people = result['people']
+    rounds = result['rounds']
+
+    print(f"=== 룰렛 시뮬레이션: {people:,}명 x {rounds}라운드 x {trials}회 반복 ===")
+    print(f"총 스핀 {result['total_spins']:,}회, 총 당첨 {result['total_wins']:,}회 "
+          f"({elapsed:.2f}초, 초당 {result['total_spins'] / max(elapsed, 1e-9):,.0f} 스핀)")
+
+    if people == 0:
+        print("시뮬레이션할 사용자가 없습니다.")
+        return
+
+    granted = result['granted_per_round'].sum(axis=1)
+    spent = result['spins_per_round'].sum(axis=1)
+    outstanding_end = result['outstanding_per_round'][:, -1]
+    print("\n[룰렛권 인플레이션]")
+    print(f"  시작 시 보유 룰렛권: {result['initial_tickets']:,}개")
+    print(f"  별점으로 지급된 룰렛권 (반복당): {_percentiles(granted)}")
+    print(f"  사용된 룰렛권 (반복당): {_percentiles(spent)}")
+    print(f"  마지막 라운드 미사용 룰렛권: {_percentiles(outstanding_end)}")
+    print(f"  1인당 미사용 룰렛권 (중앙값): {np.median(outstanding_end) / people:.2f}개")
+    checkpoints = sorted({max(1, rounds // 4), max(1, rounds // 2), rounds})
+    for r in checkpoints:
+        avg = result['outstanding_per_round'][:, r - 1].mean()
+        print(f"    {r:>4}라운드 후 평균 미사용 룰렛권: {avg:,.1f}개")
+
+    print("\n[1인당 당첨 횟수 분포]")
+    hist = result['win_histogram']
+    total = hist.sum()
+    for wins, count in enumerate(hist):
+        label = f"{wins}회 이상" if wins == WIN_HISTOGRAM_CAP else f"{wins}회"
+        print(f"  {label:>7}: {count / total:6.2%}")
+
+    if prize_stock is not None:
+        exhausted_round = result['exhausted_round']
+        ran_out = exhausted_round[exhausted_round > 0]
+        print(f"\n[상품 재고 {prize_stock:,}개 소진]")
+        print(f"  재고가 바닥난 비율: {len(ran_out) / trials:.1%}")
+        if len(ran_out):
+            print(f"  바닥난 라운드: {_percentiles(ran_out)}")
+        print(f"  재고 없이 당첨된 횟수 (반복당): {_percentiles(result['unfulfilled_wins'])}")
+        for r in checkpoints:
+            avg = result['stock_left_per_round'][:, r - 1].mean()
+            print(f"    {r:>4}라운드 후 평균 남은 재고: {avg:,.1f}개")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="룰렛 경제 몬테카를로 시뮬레이터")
+    parser.add_argument('--from-db', action='store_true', help="현재 Person 테이블을 초기 상태로 사용")
+    parser.add_argument('--people', type=int, default=10_000, help="가상 사용자 수 (--from-db 가 아닐 때)")
+    parser.add_argument('--init-tickets', type=int, default=0, help="가상 사용자의 시작 룰렛권")
+    parser.add_argument('--init-stars', type=int, default=0, help="가상 사용자의 시작 별점")
+    parser.add_argument('--rounds', type=int, default=100, help="라운드(일) 수")
+    parser.add_argument('--trials', type=int, default=20, help="몬테카를로 반복 횟수")
+    parser.add_argument('--win-rate', type=float, default=ROULETTE_WIN_RATE, help="당첨 확률")
+    parser.add_argument('--stars-per-ticket', type=int, default=None,
+                        help=f"룰렛권 1개에 필요한 별점 (기본: --from-db 면 반별 설정, 아니면 {STARS_PER_TICKET})")
+    parser.add_argument('--star-rate', type=float, default=1.0, help="라운드당 1인 평균 별점 지급 수")
+    parser.add_argument('--spend-rate', type=float, default=1.0, help="라운드마다 보유 룰렛권 중 사용하는 비율")
+    parser.add_argument('--prize-stock', type=int, default=None, help="상품 재고 (주면 소진 시점을 계산)")
+    parser.add_argument('--batch-size', type=int, default=1_000_000, help="한 번에 처리할 (반복 x 사용자) 원소 수")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if not 0.0 <= args.win_rate <= 1.0 or not 0.0 <= args.spend_rate <= 1.0:
+        parser.error("--win-rate 와 --spend-rate 는 0과 1 사이여야 합니다.")
+    if (args.stars_per_ticket is not None and args.stars_per_ticket < 1) or args.trials < 1 or args.rounds < 1:
+        parser.error("--stars-per-ticket, --trials, --rounds 는 1 이상이어야 합니다.")
+
+    if args.from_db:
+        tickets0, stars0, stars_per_ticket = load_population_from_db()
+    else:
+        tickets0, stars0 = synthetic_population(args.people, args.init_tickets, args.init_stars)
+        stars_per_ticket = STARS_PER_TICKET
+    if args.stars_per_ticket is not None:  # 직접 주면 모든 반에 그 기준을 적용해 본다
+        stars_per_ticket = args.stars_per_ticket
+
+    started = time.perf_counter()
+    result = simulate(tickets0, stars0, args.rounds, args.trials, args.win_rate,
+                      stars_per_ticket, args.star_rate, args.spend_rate,
+                      prize_stock=args.prize_stock, batch_size=args.batch_size, seed=args.seed)
+    elapsed = time.perf_counter() - started
+    print_report(result, args.prize_stock, elapsed)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
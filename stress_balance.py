@@ -0,0 +1,139 @@
+# stress_balance.py
+# 룰렛권/별점 변경이 동시에 몰려도 잔액이 맞는지 확인하는 경합 스트레스 테스트.
+#
+#   python stress_balance.py                      # 임시 SQLite 파일 DB
+#   DATABASE_URL=postgresql://... python stress_balance.py --threads 32 --ops 500
+#   python stress_balance.py --naive              # 예전 방식(읽고-바꾸고-커밋)이 변경을 잃어버리는 것 확인
+#
+# 여러 스레드가 "같은 소수의 사용자"에게 룰렛권 지급/삭제, 스핀, 별점 지급을 마구 섞어서 보낸 뒤
+# 성공한 작업 수로 계산한 기대값과 DB 의 최종 값이 정확히 같은지 비교한다.
+# 별점은 STARS_PER_TICKET 개마다 룰렛권으로 바뀌므로
+#   stars_final + STARS_PER_TICKET * 전환 횟수 = 지급한 별점 수
+#   tickets_final = 지급 - 삭제 - 스핀 + 전환 횟수
+# 두 식이 모두 맞아야 통과다.
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'stress.db')
+os.environ.setdefault('CAMPAIGN_RUNNER', 'off')
+
+from app import (create_app, db, Person, STARS_PER_TICKET, BalanceConflict, BalanceRejected, update_balance,
+                 give_ticket_change, remove_ticket_change, give_star_change, spin_ticket_change)
+
+app = create_app()
+
+OPERATIONS = {
+    'give_ticket': give_ticket_change,
+    'remove_ticket': remove_ticket_change,
+    'spin': spin_ticket_change,
+    'give_star': give_star_change,
+}
+
+
+def naive_update(person_id, change):
+    """비교용: 예전 엔드포인트처럼 읽고, 파이썬에서 바꾸고, 그냥 커밋한다."""
+    person = db.session.get(Person, person_id, populate_existing=True)
+    values = change(person)
+    time.sleep(random.uniform(0, 0.002))  # 실제 요청 처리처럼 읽기와 쓰기 사이에 약간의 틈
+    for key, value in values.items():
+        setattr(person, key, value)
+    db.session.commit()
+    return person
+
+
+def worker(person_ids, ops, naive, counts, lock, barrier):
+    local = Counter()
+    with app.app_context():
+        barrier.wait()
+        for _ in range(ops):
+            person_id = random.choice(person_ids)
+            name = random.choice(list(OPERATIONS))
+            try:
+                if naive:
+                    naive_update(person_id, OPERATIONS[name])
+                else:
+                    update_balance(person_id, OPERATIONS[name])
+                local[(person_id, name)] += 1
+            except BalanceRejected:
+                db.session.rollback()
+                local['rejected'] += 1
+            except BalanceConflict:
+                db.session.rollback()
+                local['conflict'] += 1
+            except Exception as e:
+                db.session.rollback()
+                local['error'] += 1
+                local[f'error: {type(e).__name__}'] += 1
+        db.session.remove()
+    with lock:
+        counts.update(local)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="룰렛권/별점 동시 변경 스트레스 테스트")
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--ops', type=int, default=300, help="스레드당 작업 수")
+    parser.add_argument('--people', type=int, default=3, help="경합을 일으킬 사용자 수 (적을수록 충돌이 많다)")
+    parser.add_argument('--naive', action='store_true', help="CAS 없이 예전 방식으로 실행")
+    args = parser.parse_args(argv)
+
+    with app.app_context():
+        db.create_all()
+        people = []
+        for i in range(args.people):
+            person = Person(name=f'stress-{os.getpid()}-{i}', tickets=0, stars=0)
+            person.password_hash = '!'
+            db.session.add(person)
+            people.append(person)
+        db.session.commit()
+        person_ids = [p.id for p in people]
+
+    counts = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(args.threads)
+    threads = [threading.Thread(target=worker, args=(person_ids, args.ops, args.naive, counts, lock, barrier))
+               for _ in range(args.threads)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    failed = False
+    with app.app_context():
+        for person_id in person_ids:
+            person = db.session.get(Person, person_id)
+            stars_given = counts[(person_id, 'give_star')]
+            converted, leftover = divmod(stars_given - person.stars, STARS_PER_TICKET)
+            expected_tickets = (counts[(person_id, 'give_ticket')] - counts[(person_id, 'remove_ticket')]
+                                - counts[(person_id, 'spin')] + converted)
+            ok = leftover == 0 and converted >= 0 and person.tickets == expected_tickets
+            failed |= not ok
+            print(f"  사용자 {person_id}: 룰렛권 {person.tickets} (기대값 {expected_tickets}), "
+                  f"별점 {person.stars} (지급 {stars_given}, 전환 {converted}회) -> {'OK' if ok else '불일치!'}")
+        Person.query.filter(Person.id.in_(person_ids)).delete(synchronize_session=False)
+        db.session.commit()
+
+    total_ops = args.threads * args.ops
+    print(f"{'naive' if args.naive else 'CAS'}: {args.threads}스레드 x {args.ops}회 = {total_ops}회, {elapsed:.2f}초 "
+          f"(거절 {counts['rejected']}, 재시도 초과 {counts['conflict']}, 오류 {counts['error']})")
+    for key, value in counts.items():
+        if isinstance(key, str) and key.startswith('error: '):
+            print(f"  {key} x {value}")
+    if failed:
+        print("잔액 불일치: 동시 변경 중 일부가 사라졌습니다.")
+        return 1
+    print("모든 잔액이 일치합니다.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
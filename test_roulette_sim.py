@@ -0,0 +1,58 @@
+# test_roulette_sim.py
+# 시뮬레이터의 별점 -> 룰렛권 전환이 실제 규칙(app.give_star_change)과 같은지 확인한다.
+#
+#   python -m pytest -q test_roulette_sim.py
+from types import SimpleNamespace
+
+import numpy as np
+
+from app import give_star_change
+from roulette_sim import award_stars, simulate
+
+
+def _live_award(tickets, stars, awarded, stars_per_ticket):
+    person = SimpleNamespace(tickets=tickets, stars=stars, stars_per_ticket=stars_per_ticket)
+    for _ in range(awarded):
+        values = give_star_change(person)
+        person.tickets, person.stars = values['tickets'], values['stars']
+    return person.tickets, person.stars
+
+
+def test_award_stars_matches_give_star_change():
+    rng = np.random.default_rng(0)
+    size = 5000
+    stars_per_ticket = rng.integers(1, 6, size=size)
+    tickets = rng.integers(0, 5, size=size)
+    stars = rng.integers(0, 8, size=size)  # 기준보다 많이 모여 있는 경우(반 기준을 낮춘 뒤)도 섞는다
+    awarded = rng.poisson(3.0, size=size)
+
+    new_tickets, new_stars, granted = award_stars(tickets, stars, awarded, stars_per_ticket)
+
+    expected = [_live_award(*args) for args in zip(tickets.tolist(), stars.tolist(), awarded.tolist(),
+                                                   stars_per_ticket.tolist())]
+    assert new_tickets.tolist() == [t for t, _ in expected]
+    assert new_stars.tolist() == [s for _, s in expected]
+    assert (granted == new_tickets - tickets).all()
+
+
+def test_simulate_mints_one_ticket_per_stars_per_ticket_stars():
+    # 한 라운드에 기준보다 많이 받아도 별점이 버려지지 않으므로, 지급량은 (받은 별점 / 기준) 에 가깝다
+    people, rounds, star_rate, stars_per_ticket = 2000, 50, 3.0, 2
+    tickets0 = np.zeros(people, dtype=np.int64)
+    result = simulate(tickets0, tickets0.copy(), rounds, 2, 0.0, stars_per_ticket, star_rate, 0.0, seed=1)
+
+    granted = result['granted_per_round'].sum(axis=1)
+    expected = people * rounds * star_rate / stars_per_ticket
+    assert np.all(np.abs(granted - expected) < expected * 0.01)
+    assert (result['outstanding_per_round'][:, -1] == granted).all()
+
+
+def test_simulate_uses_per_person_stars_per_ticket():
+    people = 1000
+    zeros = np.zeros(people, dtype=np.int64)
+    stars_per_ticket = np.where(np.arange(people) < people // 2, 1, 4)
+    result = simulate(zeros, zeros.copy(), 20, 1, 0.0, stars_per_ticket, 2.0, 0.0, seed=2)
+
+    granted = result['granted_per_round'].sum()
+    expected = (people // 2) * 20 * 2.0 / 1 + (people // 2) * 20 * 2.0 / 4
+    assert abs(granted - expected) < expected * 0.03
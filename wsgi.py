@@ -0,0 +1,7 @@
+# wsgi.py
+# gunicorn / flask CLI 진입점.
+#   gunicorn                       (gunicorn.conf.py 를 읽어서 wsgi:app 을 preload 로 띄운다)
+#   flask --app wsgi run-campaigns
+from app import create_app
+
+app = create_app()